@@ -1,3 +1,9 @@
 import logging
 
 LOG_LEVEL = logging.ERROR
+
+# Origins allowed to call the API, e.g. the local frontend development server
+CORS_ALLOWED_ORIGINS = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+]
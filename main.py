@@ -1,40 +1,86 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import logging
 import os
 
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
+from repository.database import get_engine, init_db
 from routes.auth import auth_router
 from routes.chats import chats_router
 from routes.messages import chat_messages_router
-from config import LOG_LEVEL
+from config import CORS_ALLOWED_ORIGINS, LOG_LEVEL
 
-# Configure logging
+# Configure logging once for the whole application; the other modules only
+# create their loggers
 logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI()
-
-# Add CORS middleware so the local frontend
-# developement server can call the API
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create missing tables, then warm up the ORM and the connection pool before
+    serving requests, so the first request does not pay for mapper
+    configuration or opening SQLite.
+    """
+    configure_mappers()
+    engine = app.dependency_overrides.get(get_engine, get_engine)()
+    init_db(engine)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    yield
+
+
+# Add CORS middleware so the local frontend developement server can call the
+# API. It stays in place when the built frontend is served too, since that
+# build calls the API at a fixed base URL, which need not match the origin the
+# page was opened at.
+middleware = [
+    Middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+]
+
+# Initialize FastAPI app. The routes declare their return types, so FastAPI
+# serializes their responses straight to JSON bytes with Pydantic.
+app = FastAPI(lifespan=lifespan, middleware=middleware)
+
+
+@app.exception_handler(SQLAlchemyError)
+async def database_error_handler(request: Request, exc: SQLAlchemyError):
+    """
+    Turn database errors into a 500 response. The repositories and services
+    let them propagate, so the routes only map expected outcomes to status
+    codes. This only runs when such an error occurs.
+    """
+    logger.error("Database error on %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+
+@app.exception_handler(Exception)
+async def unexpected_error_handler(request: Request, exc: Exception):
+    """
+    Give any other unhandled error the same JSON 500 body as database errors.
+    """
+    logger.exception("Unexpected error on %s %s", request.method, request.url.path)
+    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
 
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(chats_router, prefix="/chats", tags=["Chats"])
 app.include_router(chat_messages_router, prefix="/chats", tags=["Messages"])
 
-
 frontend_build_output_dir = os.environ.get("FRONTEND_BUILD_OUTPUT_DIR")
 if frontend_build_output_dir:
     app.mount(
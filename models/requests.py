@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class MessageRequest(BaseModel):
@@ -9,6 +9,9 @@ class MessageRequest(BaseModel):
         message (str): The message to be sent. Must not be empty and should be between 1 and 1000 characters.
     """
 
+    # Reject unknown fields and keep request bodies immutable
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     message: str = Field(
         ..., min_length=1, max_length=1000, description="The message to be sent."
     )
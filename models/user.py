@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class UserModel(BaseModel):
@@ -10,6 +10,8 @@ class UserModel(BaseModel):
         password (str): The password of the user.
     """
 
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     username: str = Field(
         ..., min_length=3, max_length=50, description="The username of the user."
     )
@@ -1,20 +1,236 @@
+import threading
+from cachetools import LRUCache, TTLCache
 from fastapi import Depends
+from sqlalchemy import (
+    String,
+    Text,
+    bindparam,
+    delete,
+    func,
+    insert,
+    lambda_stmt,
+    select,
+    update,
+)
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from config import LOG_LEVEL
-from repository.database import Interaction, Chat, get_session_local
+from repository.database import Interaction, Chat, SessionLocal, get_session_local
+from utils import create_uuid, ids_match
 from datetime import datetime, timezone
-from typing import Dict, List, Union, Optional
-import uuid
+from typing import Dict, Iterator, List, Union, Optional
 import logging
 
-# Configure logging
-logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
-# In-memory cache for recently used chats
-chat_cache: Dict[str, Dict] = {}
-user_chats_cache: Dict[str, List[Dict[str, str]]] = {}
+# Number of interaction rows fetched per round trip when streaming a chat
+STREAM_BATCH_SIZE = 200
+
+# Columns of an interaction as returned to clients, in interaction_from_row order
+INTERACTION_COLUMNS = (
+    Interaction.id,
+    Interaction.index,
+    Interaction.message,
+    Interaction.response,
+    Interaction.timestamp,
+)
+
+# Insert statements built once and reused with per-call parameters. They
+# target the tables directly, so the ORM bulk-insert layer is not involved.
+# The timestamp is set explicitly rather than left to the column's server
+# default, which databases created before it was added do not have, and is
+# read back so callers return the stored value.
+INSERT_CHAT = insert(Chat.__table__)
+INSERT_INTERACTION = (
+    insert(Interaction.__table__)
+    .values(timestamp=func.now())
+    .returning(Interaction.__table__.c.timestamp)
+)
+# Appends an interaction to a chat, taking the index after the chat's last
+# one in the same statement, so concurrent appends never share an index
+APPEND_INTERACTION = (
+    insert(Interaction.__table__)
+    .from_select(
+        ["id", "chat_id", "index", "message", "response", "timestamp"],
+        select(
+            bindparam("id", type_=String),
+            bindparam("chat_id", type_=String),
+            func.coalesce(func.max(Interaction.__table__.c.index), -1) + 1,
+            bindparam("message", type_=Text),
+            bindparam("response", type_=Text),
+            func.now(),
+        ).where(Interaction.__table__.c.chat_id == bindparam("chat_id")),
+    )
+    .returning(Interaction.__table__.c.index, Interaction.__table__.c.timestamp)
+)
+
+# Bounded in-memory caches for recently used chats and users' chat lists.
+# They are shared by the threadpool workers, so every access to them, and to
+# the lists they hold, goes through cache_lock.
+chat_cache: LRUCache = LRUCache(maxsize=2048)
+user_chats_cache: TTLCache = TTLCache(maxsize=10_000, ttl=600)
+cache_lock = threading.RLock()
+# Owner of recently checked chats, so ownership checks on chats that are not
+# in chat_cache do not load their interactions
+chat_owner_cache: TTLCache = TTLCache(maxsize=20_000, ttl=300)
+chat_owner_cache_lock = threading.Lock()
+# Writes to one chat (add, edit, delete) are serialized, so the index of a new
+# interaction and the cached interaction list stay in step with the database.
+# Loading a chat into chat_cache takes the same lock, so a load cannot store
+# interactions read before a concurrent write. The locks are re-entrant
+# because the write paths load the chat while holding them, and striped by
+# chat ID, so their number does not grow with chats.
+CHAT_WRITE_LOCK_STRIPES = 256
+chat_write_locks = tuple(threading.RLock() for _ in range(CHAT_WRITE_LOCK_STRIPES))
+
+
+def select_chat_interactions(chat_id: str):
+    """
+    Build the statement selecting a chat's interactions in index order.
+
+    lambda_stmt caches the constructed and compiled statement by the lambda's
+    code location, so repeat calls only bind a new chat_id.
+
+    :param chat_id: ID of the chat
+    :return: A lambda statement ready to be executed
+    """
+    return lambda_stmt(
+        lambda: select(*INTERACTION_COLUMNS)
+        .where(Interaction.chat_id == chat_id)
+        .order_by(Interaction.index)
+    )
+
+
+def select_chat_with_interactions(chat_id: str):
+    """
+    Build the statement selecting a chat's owner and name together with its
+    interactions in index order, so a chat is loaded with a single query.
+
+    :param chat_id: ID of the chat
+    :return: A lambda statement ready to be executed
+    """
+    return lambda_stmt(
+        lambda: select(Chat.user_id, Chat.name, *INTERACTION_COLUMNS)
+        .join(Interaction, Interaction.chat_id == Chat.id)
+        .where(Chat.id == chat_id)
+        .order_by(Interaction.index)
+    )
+
+
+def select_owned_chat_with_interactions(chat_id: str, user_id: str):
+    """
+    Build the statement selecting a chat's name together with its interactions
+    in index order, only if the chat belongs to the given user.
+
+    :param chat_id: ID of the chat
+    :param user_id: ID of the user
+    :return: A lambda statement ready to be executed
+    """
+    return lambda_stmt(
+        lambda: select(Chat.name, *INTERACTION_COLUMNS)
+        .join(Interaction, Interaction.chat_id == Chat.id)
+        .where(Chat.id == chat_id, Chat.user_id == user_id)
+        .order_by(Interaction.index)
+    )
+
+
+def select_chat_owner(chat_id: str):
+    """
+    Build the statement selecting the ID of the user owning a chat.
+
+    :param chat_id: ID of the chat
+    :return: A lambda statement ready to be executed
+    """
+    return lambda_stmt(lambda: select(Chat.user_id).where(Chat.id == chat_id))
+
+
+def select_user_chats(user_id: str):
+    """
+    Build the statement selecting the ID and name of every chat of a user.
+
+    :param user_id: ID of the user
+    :return: A lambda statement ready to be executed
+    """
+    return lambda_stmt(
+        lambda: select(Chat.id, Chat.name).where(Chat.user_id == user_id)
+    )
+
+
+def chat_write_lock(chat_id: str) -> threading.RLock:
+    """
+    Get the lock serializing writes to a chat and loads of it into the cache.
+
+    :param chat_id: ID of the chat
+    :return: The lock of the stripe the chat falls in
+    """
+    return chat_write_locks[hash(chat_id) % CHAT_WRITE_LOCK_STRIPES]
+
+
+def chat_owned_by(chat_id: str, user_id: str):
+    """
+    Build an EXISTS clause that is true when the chat belongs to the user, so
+    statements on interactions can check ownership without a separate query.
+
+    :param chat_id: ID of the chat
+    :param user_id: ID of the user
+    :return: The EXISTS clause
+    """
+    return select(Chat.id).where(Chat.id == chat_id, Chat.user_id == user_id).exists()
+
+
+def format_timestamp(timestamp: Optional[datetime]) -> Optional[str]:
+    """
+    Format a timestamp read from the database as an ISO 8601 string.
+
+    :param timestamp: Timestamp as returned by SQLite, naive but in UTC
+    :return: The ISO 8601 string, or None if there is no timestamp
+    """
+    if timestamp is None:
+        return None
+    return timestamp.replace(tzinfo=timezone.utc).isoformat()
+
+
+def interaction_from_row(row: Row) -> Dict:
+    """
+    Convert a row of INTERACTION_COLUMNS into an interaction dictionary.
+
+    :param row: Row holding the interaction columns
+    :return: A dictionary representing the interaction
+    """
+    interaction_id, index, message, response, timestamp = row
+    return {
+        "interaction_id": interaction_id,
+        "index": index,
+        "message": message,
+        "response": response,
+        "timestamp": format_timestamp(timestamp),
+    }
+
+
+def copy_interactions(interactions: List[Dict]) -> List[Dict]:
+    """
+    Copy a cached interaction list for a caller, together with its last
+    interaction, which the service attaches suggestions to. Cached
+    interactions are replaced rather than changed in place, so the others can
+    be shared. Must be called with cache_lock held.
+
+    :param interactions: The cached interaction list
+    :return: A list the caller may read and change without holding cache_lock
+    """
+    copied = list(interactions)
+    if copied:
+        copied[-1] = dict(copied[-1])
+    return copied
+
+
+def copy_chat(chat_data: Dict) -> Dict:
+    """
+    Copy cached chat data for a caller. Must be called with cache_lock held.
+
+    :param chat_data: The cached chat data
+    :return: Chat data the caller may read and change without holding cache_lock
+    """
+    return {**chat_data, "interactions": copy_interactions(chat_data["interactions"])}
 
 
 class ChatRepository:
@@ -22,136 +238,134 @@ class ChatRepository:
         self.db = db
 
     def create_interaction(
-        self, message: Optional[str], response: str, interaction_id: str, index: int
-    ) -> Dict[str, Union[str, int, datetime]]:
+        self,
+        message: Optional[str],
+        response: str,
+        interaction_id: str,
+        index: int,
+        timestamp: Optional[datetime],
+    ) -> Dict[str, Union[str, int]]:
         """
-        Create an interaction dictionary.
+        Create an interaction dictionary, built the same way as interactions
+        loaded from the database.
 
         :param message: The message content from the user (optional)
         :param response: The response from the chatbot
         :param interaction_id: Unique identifier for the interaction
         :param index: Index of the interaction in the chat sequence
+        :param timestamp: Timestamp stored with the interaction
         :return: A dictionary representing the interaction
         """
-        return {
-            "interaction_id": interaction_id,
-            "index": index,
-            "message": message,
-            "response": response,
-            "timestamp": datetime.now(timezone.utc),
-        }
-
-    def create_chat(
-        self, chat_name: str, greeting: str, user_id: str
-    ) -> Optional[dict]:
+        return interaction_from_row(
+            (interaction_id, index, message, response, timestamp)
+        )
+
+    def create_chat(self, chat_name: str, greeting: str, user_id: str) -> dict:
         """
         Create a new chat and store it in the database.
 
         :param user_id: ID of the user creating the chat
         :param chat_name: Name of the chat
         :param greeting: Initial greeting message
-        :return: A dictionary with chat ID, initial interaction, and chat name if successful, None otherwise
+        :return: A dictionary with chat ID, initial interaction, and chat name
+        :raises SQLAlchemyError: If the database operation fails
         """
         try:
-            chat_id = str(uuid.uuid4())
-            interaction_id = str(uuid.uuid4())
+            chat_id = create_uuid()
+            interaction_id = create_uuid()
             index = 0
+
+            # Store chat and interaction in SQLite database with Core inserts,
+            # which skip ORM object construction and unit-of-work bookkeeping
+            self.db.execute(
+                INSERT_CHAT, {"id": chat_id, "user_id": user_id, "name": chat_name}
+            )
+            timestamp = self.db.execute(
+                INSERT_INTERACTION,
+                {
+                    "id": interaction_id,
+                    "chat_id": chat_id,
+                    "index": index,
+                    "message": None,
+                    "response": greeting,
+                },
+            ).scalar_one()
+            self.db.commit()
+
             interaction = self.create_interaction(
                 message=None,
                 response=greeting,
                 interaction_id=interaction_id,
                 index=index,
+                timestamp=timestamp,
             )
 
-            # Store chat in SQLite database
-            db_chat = Chat(id=chat_id, user_id=user_id, name=chat_name)
-            self.db.add(db_chat)
-
-            # Store interaction in SQLite database
-            db_interaction = Interaction(
-                id=interaction_id,
-                chat_id=chat_id,
-                index=index,
-                message=None,
-                response=greeting,
-            )
-            self.db.add(db_interaction)
-            self.db.commit()
-
             chat_data = {
                 "user_id": user_id,
                 "interactions": [interaction],
                 "chat_name": chat_name,
                 "chat_id": chat_id,
             }
-            # Cache the interaction and chat details
-            chat_cache[chat_id] = chat_data
+            with cache_lock:
+                # Cache the interaction and chat details
+                chat_cache[chat_id] = chat_data
 
-            # Update user chats cache
-            if user_id in user_chats_cache:
-                user_chats_cache[user_id].append(
-                    {"chat_id": chat_id, "chat_name": chat_name}
-                )
-            else:
-                user_chats_cache[user_id] = [
-                    {"chat_id": chat_id, "chat_name": chat_name}
-                ]
+                # Update user chats cache. An uncached list is left to be
+                # loaded from the database, as the user may own older chats.
+                user_chats = user_chats_cache.get(user_id)
+                if user_chats is not None:
+                    user_chats.append({"chat_id": chat_id, "chat_name": chat_name})
 
             return {
                 "chat_id": chat_id,
-                "interaction": interaction,
+                "interaction": dict(interaction),
                 "chat_name": chat_name,
             }
         except SQLAlchemyError as e:
-            logger.error(f"Error creating chat for user {user_id}: {e}")
+            logger.error("Error creating chat for user %s: %s", user_id, e)
             self.db.rollback()
-            return None
+            raise
 
     def load_chat_from_db(
         self, chat_id: str
     ) -> Optional[Dict[str, Union[str, List[Dict]]]]:
         """
-        Load chat interactions from the database.
+        Load chat interactions from the database into the cache.
 
         :param chat_id: ID of the chat
-        :return: Dictionary of chat data if found, None otherwise
+        :return: The cached dictionary of chat data if found, None otherwise
+        :raises SQLAlchemyError: If the database operation fails
         """
         try:
-            interactions = (
-                self.db.query(Interaction)
-                .filter(Interaction.chat_id == chat_id)
-                .order_by(Interaction.index)
-                .all()
-            )
-
-            if not interactions:
-                return None
-
-            chat = self.db.query(Chat).filter(Chat.id == chat_id).first()
-            if not chat:
-                return None
+            with chat_write_lock(chat_id):
+                # Rows are converted as they are fetched, without first
+                # materializing a list of Row objects. Every row repeats the
+                # chat's owner and name, so they are taken from the first one.
+                user_id = chat_name = None
+                interactions = []
+                for row in self.db.execute(select_chat_with_interactions(chat_id)):
+                    if user_id is None:
+                        user_id, chat_name = row[0], row[1]
+                    interactions.append(interaction_from_row(row[2:]))
+
+                # Every chat starts with a greeting, so a chat without
+                # interactions is treated as missing
+                if not interactions:
+                    return None
 
-            chat_data = {
-                "user_id": chat.user_id,
-                "chat_name": chat.name,
-                "chat_id": chat_id,
-                "interactions": [
-                    {
-                        "interaction_id": i.id,
-                        "index": i.index,
-                        "message": i.message,
-                        "response": i.response,
-                        "timestamp": i.timestamp,
-                    }
-                    for i in interactions
-                ],
-            }
+                chat_data = {
+                    "user_id": user_id,
+                    "chat_name": chat_name,
+                    "chat_id": chat_id,
+                    "interactions": interactions,
+                }
 
-            chat_cache[chat_id] = chat_data
-            return chat_data
+                with cache_lock:
+                    chat_cache[chat_id] = chat_data
+                return chat_data
         except SQLAlchemyError as e:
-            logger.error(f"Error loading chat {chat_id} from database: {e}")
-            return None
+            logger.error("Error loading chat %s from database: %s", chat_id, e)
+            raise
 
     def verify_user_ownership(self, chat_id: str, user_id: str) -> bool:
         """
@@ -161,191 +375,370 @@ class ChatRepository:
         :param user_id: ID of the user
         :return: True if the user owns the chat, False otherwise
         """
-        if chat_id not in chat_cache:
-            chat_data = self.load_chat_from_db(chat_id)
-            if chat_data is None:
-                return False
-            chat_cache[chat_id] = chat_data
-        return chat_cache[chat_id]["user_id"] == user_id
-
-    def add_message(self, chat_id: str, message: str, response: str) -> Optional[Dict]:
+        return ids_match(self.get_chat_owner(chat_id), user_id)
+
+    def get_chat_if_owned(
+        self, chat_id: str, user_id: str
+    ) -> Optional[Dict[str, Union[str, List[Dict]]]]:
+        """
+        Get a chat only if it belongs to the given user.
+
+        :param chat_id: ID of the chat
+        :param user_id: ID of the user
+        :return: A copy of the chat data if the user owns the chat, None otherwise
+        :raises SQLAlchemyError: If the database operation fails
+        """
+        chat_data = self._get_cached_chat_if_owned(chat_id, user_id)
+        if chat_data is None:
+            return None
+        with cache_lock:
+            return copy_chat(chat_data)
+
+    def _get_cached_chat_if_owned(
+        self, chat_id: str, user_id: str
+    ) -> Optional[Dict[str, Union[str, List[Dict]]]]:
         """
-        Add a message to a chat.
+        Get the cached data of a chat only if it belongs to the given user,
+        loading it on a cache miss. The ownership check and the interaction
+        fetch are then a single JOIN query, run under the chat's write lock.
 
         :param chat_id: ID of the chat
+        :param user_id: ID of the user
+        :return: The cached chat data if the user owns the chat, None otherwise
+        :raises SQLAlchemyError: If the database operation fails
+        """
+        with cache_lock:
+            chat_data = chat_cache.get(chat_id)
+        if chat_data is not None:
+            return chat_data if ids_match(chat_data["user_id"], user_id) else None
+
+        try:
+            with chat_write_lock(chat_id):
+                # Another request may have loaded the chat while this one
+                # waited for the lock
+                with cache_lock:
+                    chat_data = chat_cache.get(chat_id)
+                if chat_data is not None:
+                    return (
+                        chat_data if ids_match(chat_data["user_id"], user_id) else None
+                    )
+
+                rows = self.db.execute(
+                    select_owned_chat_with_interactions(chat_id, user_id)
+                ).all()
+
+                if not rows:
+                    return None
+
+                chat_data = {
+                    "user_id": user_id,
+                    "chat_name": rows[0][0],
+                    "chat_id": chat_id,
+                    "interactions": [interaction_from_row(row[1:]) for row in rows],
+                }
+
+                with cache_lock:
+                    chat_cache[chat_id] = chat_data
+                return chat_data
+        except SQLAlchemyError as e:
+            logger.error("Error loading chat %s for user %s: %s", chat_id, user_id, e)
+            raise
+
+    def get_chat_owner(self, chat_id: str) -> Optional[str]:
+        """
+        Get the ID of the user owning a chat without loading its interactions.
+
+        :param chat_id: ID of the chat
+        :return: ID of the owning user if the chat exists, None otherwise
+        :raises SQLAlchemyError: If the database operation fails
+        """
+        with cache_lock:
+            chat_data = chat_cache.get(chat_id)
+        if chat_data is not None:
+            return chat_data["user_id"]
+
+        with chat_owner_cache_lock:
+            owner_id = chat_owner_cache.get(chat_id)
+        if owner_id is not None:
+            return owner_id
+
+        try:
+            owner_id = self.db.execute(select_chat_owner(chat_id)).scalar()
+        except SQLAlchemyError as e:
+            logger.error("Error loading owner of chat %s: %s", chat_id, e)
+            raise
+
+        if owner_id is not None:
+            with chat_owner_cache_lock:
+                chat_owner_cache[chat_id] = owner_id
+        return owner_id
+
+    def iter_chat_interactions(self, chat_id: str) -> Iterator[Dict]:
+        """
+        Yield the interactions of a chat in index order. Uncached chats are
+        read in batches of STREAM_BATCH_SIZE rows, so memory use does not grow
+        with the length of the chat.
+
+        The generator opens its own session because it is consumed while the
+        response is being sent, after request-scoped dependencies have closed.
+
+        :param chat_id: ID of the chat
+        :return: Iterator over interaction dictionaries
+        """
+        with cache_lock:
+            chat_data = chat_cache.get(chat_id)
+            cached_interactions = (
+                tuple(chat_data["interactions"]) if chat_data is not None else None
+            )
+        if cached_interactions is not None:
+            yield from cached_interactions
+            return
+
+        with SessionLocal() as db:
+            result = db.execute(
+                select_chat_interactions(chat_id),
+                execution_options={"yield_per": STREAM_BATCH_SIZE},
+            )
+            for row in result:
+                yield interaction_from_row(row)
+
+    def add_message(
+        self, chat_id: str, user_id: str, message: str, response: str
+    ) -> Optional[Dict]:
+        """
+        Add a message to a chat owned by the given user. The ownership check
+        is part of loading the chat, so it costs no extra query. The new index
+        is computed by the insert itself, and writes to the chat are
+        serialized, so concurrent messages get distinct indexes.
+
+        :param chat_id: ID of the chat
+        :param user_id: ID of the user
         :param message: Message to add
         :param response: Response to add
-        :return: Dictionary of the new interaction if successful, None otherwise
+        :return: Dictionary of the new interaction, or None if the user does not own the chat
+        :raises SQLAlchemyError: If the database operation fails
         """
         try:
-            if chat_id not in chat_cache:
-                chat_data = self.load_chat_from_db(chat_id)
+            with chat_write_lock(chat_id):
+                chat_data = self._get_cached_chat_if_owned(chat_id, user_id)
                 if chat_data is None:
                     return None
 
-            new_index = len(chat_cache[chat_id]["interactions"])
-            interaction_id = str(uuid.uuid4())
-            interaction = self.create_interaction(
-                message=message,
-                response=response,
-                interaction_id=interaction_id,
-                index=new_index,
-            )
-
-            db_interaction = Interaction(
-                id=interaction_id,
-                chat_id=chat_id,
-                index=new_index,
-                message=message,
-                response=response,
-            )
-            self.db.add(db_interaction)
-            self.db.commit()
+                interaction_id = create_uuid()
+                new_index, timestamp = self.db.execute(
+                    APPEND_INTERACTION,
+                    {
+                        "id": interaction_id,
+                        "chat_id": chat_id,
+                        "message": message,
+                        "response": response,
+                    },
+                ).one()
+                self.db.commit()
+
+                interaction = self.create_interaction(
+                    message=message,
+                    response=response,
+                    interaction_id=interaction_id,
+                    index=new_index,
+                    timestamp=timestamp,
+                )
 
-            chat_cache[chat_id]["interactions"].append(interaction)
+                with cache_lock:
+                    interactions = chat_data["interactions"]
+                    if len(interactions) == new_index:
+                        interactions.append(interaction)
+                    elif chat_cache.get(chat_id) is chat_data:
+                        # The cached copy is out of step with the database
+                        del chat_cache[chat_id]
 
-            return interaction
+                return dict(interaction)
         except SQLAlchemyError as e:
-            logger.error(f"Error adding message to chat {chat_id}: {e}")
+            logger.error("Error adding message to chat %s: %s", chat_id, e)
             self.db.rollback()
-            return None
+            raise
+
+    def get_owned_interaction_index(
+        self, chat_id: str, interaction_id: str, user_id: str
+    ) -> Optional[int]:
+        """
+        Get the index of an interaction of a chat, only if the chat belongs to
+        the given user. The ownership check is an EXISTS clause of the same
+        query, and only the index column is read.
+
+        :param chat_id: ID of the chat
+        :param interaction_id: ID of the interaction
+        :param user_id: ID of the user
+        :return: The index if found in a chat owned by the user, None otherwise
+        """
+        return self.db.execute(
+            select(Interaction.index).where(
+                Interaction.id == interaction_id,
+                Interaction.chat_id == chat_id,
+                chat_owned_by(chat_id, user_id),
+            )
+        ).scalar()
 
     def edit_message(
-        self, interaction_id: str, new_message: str, new_response: str
+        self,
+        chat_id: str,
+        interaction_id: str,
+        user_id: str,
+        new_message: str,
+        new_response: str,
     ) -> Optional[List[Dict]]:
         """
-        Edit a message within a chat.
+        Edit a message within a chat owned by the given user.
 
+        :param chat_id: ID of the chat
         :param interaction_id: ID of the interaction to edit
+        :param user_id: ID of the user
         :param new_message: New message content
         :param new_response: New response content
-        :return: List of remaining interactions in the chat if successful, None otherwise
+        :return: List of remaining interactions in the chat, or None if not found in a chat owned by the user
+        :raises SQLAlchemyError: If the database operation fails
         """
         try:
-            interaction = (
-                self.db.query(Interaction)
-                .filter(Interaction.id == interaction_id)
-                .first()
-            )
-            if not interaction:
-                return None
-
-            interaction.message = new_message
-            interaction.response = new_response
-            interaction.timestamp = datetime.now(timezone.utc)
-            updated_interaction_index = interaction.index
-            chat_id = interaction.chat_id
-
-            # Delete subsequent interactions
-            self.db.query(Interaction).filter(
-                Interaction.chat_id == chat_id,
-                Interaction.index > updated_interaction_index,
-            ).delete()
-            self.db.commit()
+            with chat_write_lock(chat_id):
+                # Update the interaction and read back its index and new timestamp
+                # in one statement. No row comes back if it is missing or the chat
+                # is not the user's.
+                updated = self.db.execute(
+                    update(Interaction)
+                    .where(
+                        Interaction.id == interaction_id,
+                        Interaction.chat_id == chat_id,
+                        chat_owned_by(chat_id, user_id),
+                    )
+                    .values(
+                        message=new_message, response=new_response, timestamp=func.now()
+                    )
+                    .returning(Interaction.index, Interaction.timestamp)
+                    .execution_options(synchronize_session=False)
+                ).first()
+                if updated is None:
+                    return None
+                updated_interaction_index, updated_timestamp = updated
+
+                # Delete subsequent interactions with one statement in the same
+                # transaction as the update
+                self.db.execute(
+                    delete(Interaction)
+                    .where(
+                        Interaction.chat_id == chat_id,
+                        Interaction.index > updated_interaction_index,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                self.db.commit()
+
+                with cache_lock:
+                    chat_data = chat_cache.get(chat_id)
+                    if chat_data is not None:
+                        # Cached interactions are stored in index order, so the
+                        # edited one is found by position instead of by a search
+                        interactions = chat_data["interactions"]
+                        i = updated_interaction_index
+                        if (
+                            i < len(interactions)
+                            and interactions[i]["interaction_id"] == interaction_id
+                        ):
+                            # Replaced rather than changed in place, as copies
+                            # handed out earlier may share the old dict
+                            interactions[i] = {
+                                **interactions[i],
+                                "message": new_message,
+                                "response": new_response,
+                                "timestamp": format_timestamp(updated_timestamp),
+                            }
+                            # Truncate in place instead of copying the kept prefix
+                            del interactions[i + 1 :]
+                            return copy_interactions(interactions)
+                        # The cached copy is out of step with the database
+                        del chat_cache[chat_id]
 
-            if chat_id in chat_cache:
-                interactions = chat_cache[chat_id]["interactions"]
-                for i, cached_interaction in enumerate(interactions):
-                    if cached_interaction["interaction_id"] == interaction_id:
-                        interactions[i]["message"] = new_message
-                        interactions[i]["response"] = new_response
-                        chat_cache[chat_id]["interactions"] = interactions[: i + 1]
-                        break
-                return chat_cache[chat_id]["interactions"]
-
-            chat_data = self.load_chat_from_db(chat_id)
-            return chat_data["interactions"] if chat_data else None
+                chat_data = self.load_chat_from_db(chat_id)
+                if chat_data is None:
+                    return None
+                with cache_lock:
+                    return copy_interactions(chat_data["interactions"])
         except SQLAlchemyError as e:
-            logger.error(f"Error editing message {interaction_id}: {e}")
+            logger.error("Error editing message %s: %s", interaction_id, e)
             self.db.rollback()
-            return None
+            raise
 
-    def delete_message(self, interaction_id: str) -> Optional[List[Dict]]:
+    def delete_message(
+        self, chat_id: str, interaction_id: str, user_id: str
+    ) -> Optional[List[Dict]]:
         """
-        Delete a message and all subsequent messages in a chat.
+        Delete a message and all subsequent messages in a chat owned by the
+        given user.
 
+        :param chat_id: ID of the chat
         :param interaction_id: ID of the interaction to delete
-        :return: List of remaining interactions if successful, None otherwise
+        :param user_id: ID of the user
+        :return: List of remaining interactions, or None if not found in a chat owned by the user
+        :raises SQLAlchemyError: If the database operation fails
         """
         try:
-            interaction = (
-                self.db.query(Interaction)
-                .filter(Interaction.id == interaction_id)
-                .first()
-            )
-            if not interaction:
-                return None
-
-            chat_id = interaction.chat_id
-            index_to_delete = interaction.index
-
-            # Delete interactions from the database
-            self.db.query(Interaction).filter(
-                Interaction.chat_id == chat_id, Interaction.index >= index_to_delete
-            ).delete()
-            self.db.commit()
+            with chat_write_lock(chat_id):
+                index_to_delete = self.get_owned_interaction_index(
+                    chat_id, interaction_id, user_id
+                )
+                if index_to_delete is None:
+                    return None
 
-            if chat_id in chat_cache:
-                interactions = chat_cache[chat_id]["interactions"]
-                chat_cache[chat_id]["interactions"] = [
-                    i for i in interactions if i["index"] < index_to_delete
+                # Delete the interaction and its tail with one statement
+                self.db.execute(
+                    delete(Interaction)
+                    .where(
+                        Interaction.chat_id == chat_id,
+                        Interaction.index >= index_to_delete,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                self.db.commit()
+
+                with cache_lock:
+                    chat_data = chat_cache.get(chat_id)
+                    if chat_data is not None:
+                        # Cached interactions are stored in index order, so the list
+                        # position of an interaction is its index
+                        interactions = chat_data["interactions"]
+                        del interactions[index_to_delete:]
+                        return copy_interactions(interactions)
+
+                return [
+                    interaction_from_row(row)
+                    for row in self.db.execute(select_chat_interactions(chat_id))
                 ]
-                return chat_cache[chat_id]["interactions"]
-
-            remaining_interactions = (
-                self.db.query(Interaction)
-                .filter(Interaction.chat_id == chat_id)
-                .order_by(Interaction.index)
-                .all()
-            )
-            return [
-                {
-                    "interaction_id": i.id,
-                    "index": i.index,
-                    "message": i.message,
-                    "response": i.response,
-                    "timestamp": i.timestamp,
-                }
-                for i in remaining_interactions
-            ]
         except SQLAlchemyError as e:
-            logger.error(f"Error deleting message {interaction_id}: {e}")
+            logger.error("Error deleting message %s: %s", interaction_id, e)
             self.db.rollback()
-            return None
+            raise
 
-    def list_user_chats(self, user_id: str) -> Optional[List[Dict[str, str]]]:
+    def list_user_chats(self, user_id: str) -> List[Dict[str, str]]:
         """
         List all chats linked to a specific user.
 
         :param user_id: ID of the user
-        :return: List of dictionaries containing chat ID and chat name if successful, None otherwise
+        :return: List of dictionaries containing chat ID and chat name
+        :raises SQLAlchemyError: If the database operation fails
         """
         try:
-            if user_id in user_chats_cache:
-                return user_chats_cache[user_id]
+            # Copies are returned, as create_chat appends to the cached lists
+            with cache_lock:
+                user_chats = user_chats_cache.get(user_id)
+                if user_chats is not None:
+                    return list(user_chats)
 
-            chats = self.db.query(Chat).filter(Chat.user_id == user_id).all()
             user_chats = [
-                {"chat_id": chat.id, "chat_name": chat.name} for chat in chats
+                {"chat_id": chat_id, "chat_name": chat_name}
+                for chat_id, chat_name in self.db.execute(select_user_chats(user_id))
             ]
-            user_chats_cache[user_id] = user_chats
-            return user_chats
+            with cache_lock:
+                user_chats_cache[user_id] = user_chats
+                return list(user_chats)
         except SQLAlchemyError as e:
-            logger.error(f"Error listing chats for user {user_id}: {e}")
-            return None
-
-    def get_chat(self, chat_id: str) -> Optional[Dict[str, Union[str, List[Dict]]]]:
-        """
-        Get chat interactions by chat ID. If the chat exists in the cache, return it.
-        Otherwise, fetch it from the database, cache it, and return it.
-
-        :param chat_id: ID of the chat
-        :return: Dictionary of chat data if found, None otherwise
-        """
-        if chat_id in chat_cache:
-            return chat_cache[chat_id]
-
-        chat_data = self.load_chat_from_db(chat_id)
-        if chat_data:
-            chat_cache[chat_id] = chat_data
-        return chat_data
+            logger.error("Error listing chats for user %s: %s", user_id, e)
+            raise
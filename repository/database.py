@@ -1,23 +1,24 @@
-from datetime import datetime, timezone
 from sqlalchemy import (
+    Index,
     UniqueConstraint,
     create_engine,
+    event,
     Column,
     String,
     Text,
     DateTime,
     Integer,
     ForeignKey,
+    func,
 )
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
-from config import LOG_LEVEL
+from sqlalchemy.pool import QueuePool
 from utils import create_uuid
 import logging
 from typing import Generator
 
-# Configure logging
-logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 # Constants
@@ -25,16 +26,81 @@ DATABASE_URL = "sqlite:///./chats.db"
 CHAT_TABLE_NAME = "chats"
 USER_TABLE_NAME = "users"
 INTERACTION_TABLE_NAME = "interactions"
+# Sized so that every thread of AnyIO's default 40-thread pool, which runs
+# the blocking request handlers and dependencies, can hold a connection
+POOL_SIZE = 20
+POOL_MAX_OVERFLOW = 20
+POOL_RECYCLE_SECONDS = 3600
+# How long a connection waits for another connection's write lock before
+# failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_SECONDS = 30
+# Number of compiled SQL statements kept per engine, raised from the default
+# of 500 so the statements of all endpoints stay compiled
+QUERY_CACHE_SIZE = 2000
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA foreign_keys=ON",
+)
 
 # Set up the database engine
 try:
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # Keep SQLite connections open in a pool so requests reuse them instead
+    # of reopening the database file (and its WAL/SHM files) every time
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_SECONDS,
+        },
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=POOL_RECYCLE_SECONDS,
+        query_cache_size=QUERY_CACHE_SIZE,
+    )
+    # Objects are not expired on commit, so reading them afterwards does not
+    # issue another SELECT
+    SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+    )
 except SQLAlchemyError as e:
-    logger.error(f"Error setting up database engine: {e}")
+    logger.error("Error setting up database engine: %s", e)
     raise
 
 
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Tune every new SQLite connection for the chat workload.
+
+    WAL journaling with synchronous=NORMAL avoids an fsync per commit and
+    lets readers proceed while a write is in progress. Since connections are
+    pooled, this runs once per connection rather than once per request.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def get_engine() -> Engine:
+    """
+    Provide the engine the application runs on. The startup code resolves it
+    through app.dependency_overrides, so tests can supply their own engine.
+
+    Returns:
+        Engine: The application's database engine.
+    """
+    return engine
+
+
 def get_session_local() -> Generator:
     """
     Provide a transactional scope around a series of operations.
@@ -49,7 +115,7 @@ def get_session_local() -> Generator:
     try:
         yield db
     except SQLAlchemyError as e:
-        logger.error(f"Database session error: {e}")
+        logger.error("Database session error: %s", e)
         db.rollback()
         raise
     finally:
@@ -75,11 +141,18 @@ class Interaction(Base):
     __tablename__ = INTERACTION_TABLE_NAME
 
     id = Column(String, primary_key=True, default=create_uuid)
-    chat_id = Column(String, ForeignKey(f"{CHAT_TABLE_NAME}.id"), index=True)
+    chat_id = Column(String, ForeignKey(f"{CHAT_TABLE_NAME}.id"))
     index = Column(Integer)
     message = Column(Text)
     response = Column(Text)
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    # Set by SQLite (CURRENT_TIMESTAMP, UTC) rather than by Python. The inserts
+    # pass func.now() explicitly, since create_all does not add the default to
+    # tables created before it existed.
+    timestamp = Column(DateTime, server_default=func.now())
+
+    # Serves both "all interactions of a chat ordered by index" and
+    # "interactions of a chat after a given index" with one range scan
+    __table_args__ = (Index("ix_interactions_chat_id_index", "chat_id", "index"),)
 
 
 class User(Base):
@@ -98,7 +171,7 @@ class User(Base):
     id = Column(String, primary_key=True, default=create_uuid)
     username = Column(String, unique=True, nullable=False, index=True)
     hashed_password = Column(String, nullable=False)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, server_default=func.now())
 
     __table_args__ = (UniqueConstraint("username", name="unique_username_constraint"),)
 
@@ -122,13 +195,32 @@ class Chat(Base):
 
     user = relationship("User", back_populates="chats")
 
+    # Covers listing a user's chats: the selected columns come from the index
+    __table_args__ = (Index("ix_chats_user_id_name_id", "user_id", "name", "id"),)
+
 
 # Add back-reference to User model
 User.chats = relationship("Chat", order_by=Chat.id, back_populates="user")
 
-# Create the database tables with error handling
-try:
-    Base.metadata.create_all(bind=engine)
-except SQLAlchemyError as e:
-    logger.error(f"Error creating database tables: {e}")
-    raise
+
+def init_db(bind: Engine = engine) -> None:
+    """
+    Create the database tables and indexes that do not exist yet. Called once
+    at application startup rather than as a side effect of importing this module.
+
+    Args:
+        bind (Engine): The engine of the database to initialize.
+
+    Raises:
+        SQLAlchemyError: If the tables or indexes cannot be created.
+    """
+    try:
+        Base.metadata.create_all(bind=bind)
+        # create_all skips tables that already exist, so make sure indexes added
+        # after a database was first created are present as well
+        for table in Base.metadata.sorted_tables:
+            for table_index in table.indexes:
+                table_index.create(bind=bind, checkfirst=True)
+    except SQLAlchemyError as e:
+        logger.error("Error creating database tables: %s", e)
+        raise
@@ -1,16 +1,39 @@
 import logging
-from fastapi import Depends, HTTPException
+import threading
+from cachetools import TTLCache
+from fastapi import Depends
+from sqlalchemy import func, lambda_stmt, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from config import LOG_LEVEL
+from sqlalchemy.exc import SQLAlchemyError
+from exceptions import UserAlreadyExistsException
 from repository.database import User, get_session_local
-from typing import Optional
+from utils import create_uuid
+from typing import NamedTuple, Optional
 
-# Configure logging
-logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 
+class UserRecord(NamedTuple):
+    """
+    Read-only snapshot of a user row, safe to share across sessions and threads.
+
+    Attributes:
+        id (str): Unique identifier for the user.
+        username (str): Unique username for the user.
+        hashed_password (str): User's hashed password for authentication.
+    """
+
+    id: str
+    username: str
+    hashed_password: str
+
+
+# Short-lived cache of user lookups by username, shared by all requests
+user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+user_cache_lock = threading.Lock()
+
+
 class UserRepository:
     """
     Repository class for handling user-related database operations.
@@ -24,39 +47,98 @@ class UserRepository:
         """
         self.db = db
 
-    def get_user_by_username(self, username: str) -> Optional[User]:
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
         """
-        Retrieve a user from the database by their username.
+        Retrieve a user by their username, using the user cache when possible.
 
         :param username: The username of the user to retrieve
-        :return: User object if found, None otherwise
+        :return: UserRecord if found, None otherwise
         """
+        with user_cache_lock:
+            cached_user = user_cache.get(username)
+        if cached_user is not None:
+            return cached_user
+
         try:
-            user = self.db.query(User).filter(User.username == username).first()
-            return user
+            # lambda_stmt caches the compiled statement, only username is rebound
+            user = self.db.execute(
+                lambda_stmt(
+                    lambda: select(User.id, User.username, User.hashed_password).where(
+                        User.username == username
+                    )
+                )
+            ).first()
         except SQLAlchemyError as e:
-            logger.error(f"Database error while retrieving user {username}: {str(e)}")
+            logger.error("Database error while retrieving user %s: %s", username, e)
             raise
 
-    def create_user(self, username: str, hashed_password: str) -> User:
+        if user is None:
+            return None
+
+        user_record = UserRecord(*user)
+        with user_cache_lock:
+            user_cache[username] = user_record
+        return user_record
+
+    def create_user(self, username: str, hashed_password: str) -> UserRecord:
         """
-        Create a new user in the database.
+        Create a new user in the database. The insert itself detects a taken
+        username, so no lookup is needed beforehand.
 
         :param username: The username for the new user
         :param hashed_password: The hashed password for the new user
-        :return: Newly created User object
+        :return: UserRecord of the newly created user
+        :raises UserAlreadyExistsException: If the username is already taken
         """
         try:
-            new_user = User(username=username, hashed_password=hashed_password)
-            self.db.add(new_user)
+            # The id is generated here so the caller gets it without reading
+            # the row back after commit
+            user_id = create_uuid()
+            created_id = self.db.execute(
+                insert(User)
+                .values(
+                    id=user_id,
+                    username=username,
+                    hashed_password=hashed_password,
+                    # Set explicitly, as older databases lack the column default
+                    created_at=func.now(),
+                )
+                .on_conflict_do_nothing(index_elements=["username"])
+                .returning(User.id)
+            ).scalar()
             self.db.commit()
-            self.db.refresh(new_user)
-            return new_user
-        except IntegrityError:
+        except SQLAlchemyError as e:
             self.db.rollback()
-            logger.warning(f"Attempt to create duplicate user: {username}")
-            raise HTTPException(status_code=409, detail="Username is already taken")
+            logger.error("Database error while creating user %s: %s", username, e)
+            raise
+
+        if created_id is None:
+            logger.warning("Attempt to create duplicate user: %s", username)
+            raise UserAlreadyExistsException()
+
+        with user_cache_lock:
+            user_cache.pop(username, None)
+        return UserRecord(user_id, username, hashed_password)
+
+    def update_password_hash(self, username: str, hashed_password: str) -> None:
+        """
+        Replace the stored password hash of a user.
+
+        :param username: The username of the user to update
+        :param hashed_password: The new hashed password
+        """
+        try:
+            self.db.execute(
+                update(User)
+                .where(User.username == username)
+                .values(hashed_password=hashed_password)
+            )
+            self.db.commit()
+            with user_cache_lock:
+                user_cache.pop(username, None)
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Database error while creating user {username}: {str(e)}")
+            logger.error(
+                "Database error while updating password of user %s: %s", username, e
+            )
             raise
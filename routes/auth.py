@@ -1,20 +1,49 @@
+import anyio
 from fastapi import APIRouter, HTTPException, Depends
-from exceptions import InvalidCredentialsException, UserAlreadyExistsException
+from exceptions import (
+    InternalServerException,
+    InvalidCredentialsException,
+    UserAlreadyExistsException,
+)
 from models.user import UserModel
 from models.user_token import UserToken
 import logging
+import os
 from services.auth_service import AuthService
-from typing import Dict
+from typing import Dict, Optional
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create a router for authentication endpoints
+# Maximum number of password hashes computed at once. Password hashing gets its
+# own limiter so that it cannot take every thread of the shared threadpool
+# that the blocking database calls of other endpoints also run on.
+PASSWORD_HASHING_CONCURRENCY = (os.cpu_count() or 1) * 2
+password_hashing_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def get_password_hashing_limiter() -> anyio.CapacityLimiter:
+    """
+    Get the limiter for password hashing threads, creating it on first use
+    since it has to be created inside the running event loop.
+
+    Returns:
+        anyio.CapacityLimiter: The shared password hashing limiter.
+    """
+    global password_hashing_limiter
+    if password_hashing_limiter is None:
+        password_hashing_limiter = anyio.CapacityLimiter(PASSWORD_HASHING_CONCURRENCY)
+    return password_hashing_limiter
+
+
+# Create a router for authentication endpoints. UserToken is declared for the
+# OpenAPI docs only: the token dict is built by AuthService, so response_model
+# is set to None to stop FastAPI revalidating it from the return annotation.
 auth_router = APIRouter()
 
 
-@auth_router.post("/register", response_model=UserToken)
+@auth_router.post(
+    "/register", response_model=None, responses={200: {"model": UserToken}}
+)
 async def register(
     user: UserModel, auth_service: AuthService = Depends(AuthService)
 ) -> Dict[str, str]:
@@ -32,18 +61,21 @@ async def register(
         HTTPException: If the username is already taken or if there's an internal server error.
     """
     try:
-        return auth_service.register_user(user)
+        # Password hashing is CPU-bound, keep it off the event loop
+        return await anyio.to_thread.run_sync(
+            auth_service.register_user, user, limiter=get_password_hashing_limiter()
+        )
     except UserAlreadyExistsException:
         logger.warning(
-            f"Attempted registration with existing username: {user.username}"
+            "Attempted registration with existing username: %s", user.username
         )
         raise HTTPException(status_code=409, detail="Username is already taken")
-    except Exception as e:
-        logger.error(f"Error registering user: {e}", exc_info=True)
+    except InternalServerException as e:
+        logger.error("Error registering user: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@auth_router.post("/login", response_model=UserToken)
+@auth_router.post("/login", response_model=None, responses={200: {"model": UserToken}})
 async def login(
     user: UserModel, auth_service: AuthService = Depends(AuthService)
 ) -> Dict[str, str]:
@@ -61,10 +93,13 @@ async def login(
         HTTPException: If the credentials are invalid or if there's an internal server error.
     """
     try:
-        return auth_service.login_user(user)
+        # Password verification is CPU-bound, keep it off the event loop
+        return await anyio.to_thread.run_sync(
+            auth_service.login_user, user, limiter=get_password_hashing_limiter()
+        )
     except InvalidCredentialsException:
-        logger.warning(f"Failed login attempt for user: {user.username}")
+        logger.warning("Failed login attempt for user: %s", user.username)
         raise HTTPException(status_code=401, detail="Invalid username or password")
-    except Exception as e:
-        logger.error(f"Error logging in user: {e}", exc_info=True)
+    except InternalServerException as e:
+        logger.error("Error logging in user: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,24 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from config import LOG_LEVEL
-from repository.database import User
+from fastapi.responses import StreamingResponse
 from services.chat_service import ChatService
-from services.auth_service import AuthService
-import logging
+from services.auth_service import AuthService, CurrentUser
 from typing import Dict, List
 
-# Configure logging
-logging.basicConfig(level=LOG_LEVEL)
-logger = logging.getLogger(__name__)
-
-# Create a new router
+# Plain def endpoints run in the threadpool, off the event loop
 chats_router = APIRouter()
 
 
 @chats_router.post("/init")
-async def create_chat(
+def create_chat(
     chat_name: str = Query(...),
     chat_service: ChatService = Depends(ChatService),
-    current_user: User = Depends(AuthService.get_current_user),
+    current_user: CurrentUser = Depends(AuthService.get_current_user),
 ) -> Dict:
     """
     Create a new chat for the current user.
@@ -26,13 +20,13 @@ async def create_chat(
     Args:
         chat_name (str): The name of the new chat.
         chat_service (ChatService): The chat service dependency.
-        current_user (User): The current authenticated user.
+        current_user (CurrentUser): The current authenticated user.
 
     Returns:
         Dict: The details of the created chat.
 
     Raises:
-        HTTPException: If there's an error creating the chat.
+        HTTPException: If the chat name is empty.
     """
     try:
         if not chat_name or len(chat_name.strip()) == 0:
@@ -42,16 +36,13 @@ async def create_chat(
         return new_chat
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        logger.error(f"Error creating chat: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @chats_router.get("/{chat_id}")
-async def get_chat_interactions(
+def get_chat_interactions(
     chat_id: str,
     chat_service: ChatService = Depends(ChatService),
-    current_user: User = Depends(AuthService.get_current_user),
+    current_user: CurrentUser = Depends(AuthService.get_current_user),
 ) -> Dict:
     """
     Get all interactions for a specific chat.
@@ -59,54 +50,67 @@ async def get_chat_interactions(
     Args:
         chat_id (str): The ID of the chat.
         chat_service (ChatService): The chat service dependency.
-        current_user (User): The current authenticated user.
+        current_user (CurrentUser): The current authenticated user.
 
     Returns:
         Dict: The interactions for the specified chat.
 
     Raises:
-        HTTPException: If the user doesn't have permission or the chat is not found.
+        HTTPException: If the chat is not found or the user doesn't have permission.
     """
-    try:
-        if not chat_service.verify_user_ownership(chat_id, current_user.id):
-            raise HTTPException(
-                status_code=403,
-                detail="You do not have permission to access this chat.",
-            )
-        chat_data = chat_service.get_chat(chat_id)
-        if chat_data is None:
-            raise HTTPException(status_code=404, detail="Chat not found")
-        return chat_data
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error retrieving chat interactions: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
+    chat_data = chat_service.get_chat_if_owned(chat_id, current_user.id)
+    if chat_data is None:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this chat.",
+        )
+    return chat_data
+
+
+@chats_router.get("/{chat_id}/stream")
+def stream_chat_interactions(
+    chat_id: str,
+    chat_service: ChatService = Depends(ChatService),
+    current_user: CurrentUser = Depends(AuthService.get_current_user),
+) -> StreamingResponse:
+    """
+    Stream all interactions for a specific chat as a JSON array. Intended for
+    long chats, which are sent in batches instead of being built in memory.
+
+    Args:
+        chat_id (str): The ID of the chat.
+        chat_service (ChatService): The chat service dependency.
+        current_user (CurrentUser): The current authenticated user.
+
+    Returns:
+        StreamingResponse: The interactions for the specified chat.
+
+    Raises:
+        HTTPException: If the chat is not found or the user doesn't have permission.
+    """
+    stream = chat_service.stream_chat_if_owned(chat_id, current_user.id)
+    if stream is None:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this chat.",
+        )
+    return StreamingResponse(stream, media_type="application/json")
 
 
 @chats_router.get("/")
-async def list_user_chats(
+def list_user_chats(
     chat_service: ChatService = Depends(ChatService),
-    current_user: User = Depends(AuthService.get_current_user),
+    current_user: CurrentUser = Depends(AuthService.get_current_user),
 ) -> List[Dict]:
     """
     List all chats for the current user.
 
     Args:
         chat_service (ChatService): The chat service dependency.
-        current_user (User): The current authenticated user.
+        current_user (CurrentUser): The current authenticated user.
 
     Returns:
         List[Dict]: A list of chats belonging to the user.
-
-    Raises:
-        HTTPException: If there's an error listing the chats.
     """
-    try:
-        user_chats = chat_service.list_user_chats(current_user.id)
-        return user_chats
-    except Exception as e:
-        logger.error(
-            f"Error listing chats for user {current_user.id}: {e}", exc_info=True
-        )
-        raise HTTPException(status_code=500, detail="Internal server error")
+    user_chats = chat_service.list_user_chats(current_user.id)
+    return user_chats
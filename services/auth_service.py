@@ -1,10 +1,15 @@
+import hashlib
+import json
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Dict
+import threading
+import time
+from cachetools import TTLCache
+from datetime import timedelta
+from typing import Dict, NamedTuple, Optional, Tuple
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
-from repository.database import User, get_session_local
+from sqlalchemy.exc import SQLAlchemyError
 from exceptions import (
     InternalServerException,
     InvalidCredentialsException,
@@ -12,17 +17,69 @@ from exceptions import (
 )
 from models.auth_settings import auth_settings
 import jwt
+import orjson
 
 from models.user import UserModel
 from repository.user_repository import UserRepository
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# bcrypt cost factor for password hashes. Hashes made with another cost are
+# rehashed with this one on the next successful login.
+BCRYPT_ROUNDS = 10
+
+# Password hashing context, built once and shared by all requests. Passwords
+# are pre-hashed with HMAC-SHA256 before bcrypt (bcrypt_sha256), so bytes past
+# bcrypt's 72-byte limit still count. Plain bcrypt hashes from before the
+# switch still verify and are rehashed on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256", "bcrypt"],
+    deprecated="auto",
+    bcrypt_sha256__default_rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__min_rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Recently decoded access tokens, so repeat requests with the same token
+# skip signature verification. Keys are SHA-256 digests of the token, so
+# raw tokens are not kept in memory. Entries are (CurrentUser, exp) pairs.
+token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+token_cache_lock = threading.Lock()
+
+# The signing key as bytes, encoded once instead of on every encode and decode
+SECRET_KEY_BYTES = auth_settings.secret_key.encode()
+
+# Signs the claims directly: they are already serialized with orjson, so the
+# claim handling of jwt.encode is skipped
+jws = jwt.PyJWS(algorithms=[auth_settings.algorithm])
+
+
+class OrjsonEncoder(json.JSONEncoder):
+    """
+    JSON encoder handed to PyJWT so token headers are serialized with orjson
+    instead of the pure Python encoder.
+    """
+
+    def encode(self, o) -> str:
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(o, option=option).decode()
+
+
+class CurrentUser(NamedTuple):
+    """
+    Identity of the authenticated user, read from the access token claims.
+
+    Attributes:
+        id (str): Unique identifier for the user.
+        username (str): Username of the user.
+    """
+
+    id: str
+    username: str
+
 
 class AuthService:
     """
@@ -35,7 +92,7 @@ class AuthService:
 
         :param user_repo: An instance of UserRepository for database operations
         """
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.pwd_context = pwd_context
         self.user_repo = user_repo
 
     def hash_password(self, password: str) -> str:
@@ -49,22 +106,25 @@ class AuthService:
         try:
             return self.pwd_context.hash(password)
         except Exception as e:
-            logger.error(f"Error hashing password: {e}", exc_info=True)
+            logger.error("Error hashing password: %s", e, exc_info=True)
             raise InternalServerException("Error hashing password")
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    def verify_and_update_password(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
         """
-        Verify a plain text password against a hashed password.
+        Verify a plain text password against a hashed password, and rehash it
+        if the stored hash does not use the current hashing policy.
 
         :param plain_password: The plain text password to verify
         :param hashed_password: The hashed password to compare against
-        :return: True if the password is correct, False otherwise
+        :return: Whether the password is correct, and a replacement hash if one is needed
         :raises InternalServerException: If there's an error during verification
         """
         try:
-            return self.pwd_context.verify(plain_password, hashed_password)
+            return self.pwd_context.verify_and_update(plain_password, hashed_password)
         except Exception as e:
-            logger.error(f"Error verifying password: {e}", exc_info=True)
+            logger.error("Error verifying password: %s", e, exc_info=True)
             raise InternalServerException("Error verifying password")
 
     def create_access_token(
@@ -79,15 +139,17 @@ class AuthService:
         :raises InternalServerException: If there's an error creating the token
         """
         try:
-            to_encode = data.copy()
-            expire = datetime.now(timezone.utc) + expires_delta
-            to_encode.update({"exp": expire})
-            encoded_jwt = jwt.encode(
-                to_encode, auth_settings.secret_key, algorithm=auth_settings.algorithm
+            # exp is written as the epoch seconds it is encoded to anyway
+            expire = int(time.time() + expires_delta.total_seconds())
+            encoded_jwt = jws.encode(
+                orjson.dumps({**data, "exp": expire}),
+                SECRET_KEY_BYTES,
+                algorithm=auth_settings.algorithm,
+                json_encoder=OrjsonEncoder,
             )
             return encoded_jwt
         except Exception as e:
-            logger.error(f"Error creating access token: {e}", exc_info=True)
+            logger.error("Error creating access token: %s", e, exc_info=True)
             raise InternalServerException("Error creating access token")
 
     def register_user(self, user: UserModel) -> Dict[str, str]:
@@ -97,26 +159,24 @@ class AuthService:
         :param user: The user model containing registration information
         :return: A dictionary with the access token and token type
         :raises UserAlreadyExistsException: If the username is already taken
-        :raises InternalServerException: If there's an error during registration
+        :raises SQLAlchemyError: If the database operation fails
+        :raises InternalServerException: If there's another error during registration
         """
         try:
-            existing_user = self.user_repo.get_user_by_username(user.username)
-            if existing_user:
-                logger.warning(
-                    f"Attempted registration with existing username: {user.username}"
-                )
-                raise UserAlreadyExistsException()
-
             hashed_password = self.hash_password(user.password)
+            # A taken username is detected by the insert, which raises
+            # UserAlreadyExistsException
             new_user = self.user_repo.create_user(user.username, hashed_password)
 
-            access_token = self.create_access_token({"sub": new_user.username})
-            logger.info(f"User registered successfully: {user.username}")
+            access_token = self.create_access_token(
+                {"sub": new_user.id, "usr": new_user.username}
+            )
+            logger.info("User registered successfully: %s", user.username)
             return {"access_token": access_token, "token_type": "bearer"}
-        except UserAlreadyExistsException:
+        except (UserAlreadyExistsException, SQLAlchemyError):
             raise
         except Exception as e:
-            logger.error(f"Error registering user: {e}", exc_info=True)
+            logger.error("Error registering user: %s", e, exc_info=True)
             raise InternalServerException("Error registering user")
 
     def login_user(self, user: UserModel) -> Dict[str, str]:
@@ -126,51 +186,77 @@ class AuthService:
         :param user: The user model containing login credentials
         :return: A dictionary with the access token and token type
         :raises InvalidCredentialsException: If the credentials are invalid
-        :raises InternalServerException: If there's an error during login
+        :raises SQLAlchemyError: If the database operation fails
+        :raises InternalServerException: If there's another error during login
         """
         try:
             db_user = self.user_repo.get_user_by_username(user.username)
-            if not db_user or not self.verify_password(
-                user.password, db_user.hashed_password
-            ):
-                logger.warning(f"Failed login attempt for user: {user.username}")
+            if db_user:
+                verified, new_hash = self.verify_and_update_password(
+                    user.password, db_user.hashed_password
+                )
+            else:
+                # Spend as long as a real verification, so response times do
+                # not reveal which usernames exist
+                self.pwd_context.dummy_verify()
+                verified, new_hash = False, None
+            if not verified:
+                logger.warning("Failed login attempt for user: %s", user.username)
                 raise InvalidCredentialsException()
 
-            access_token = self.create_access_token({"sub": db_user.username})
-            logger.info(f"User logged in successfully: {user.username}")
+            if new_hash:
+                try:
+                    self.user_repo.update_password_hash(db_user.username, new_hash)
+                except Exception as e:
+                    # The old hash still verifies, so the login can go ahead
+                    logger.error("Error rehashing password: %s", e, exc_info=True)
+
+            access_token = self.create_access_token(
+                {"sub": db_user.id, "usr": db_user.username}
+            )
+            logger.info("User logged in successfully: %s", user.username)
             return {"access_token": access_token, "token_type": "bearer"}
-        except InvalidCredentialsException:
+        except (InvalidCredentialsException, SQLAlchemyError):
             raise
         except Exception as e:
-            logger.error(f"Error logging in user: {e}", exc_info=True)
+            logger.error("Error logging in user: %s", e, exc_info=True)
             raise InternalServerException("Error logging in user")
 
     @staticmethod
-    def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        user_repo: UserRepository = Depends(UserRepository),
-    ) -> User:
+    def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
         """
-        Get the current user by decoding the JWT token.
+        Get the current user by decoding the JWT token. The token carries the
+        user ID, so no database lookup is needed.
 
         :param token: The JWT token obtained from the OAuth2PasswordBearer
-        :param user_repo: The UserRepository instance
-        :return: The authenticated User object
-        :raises HTTPException: If the token is invalid or expired, or if the user is not found
+        :return: The authenticated user's CurrentUser
+        :raises HTTPException: If the token is invalid, expired, or missing user claims
         """
+        token_key = hashlib.sha256(token.encode()).digest()
+        with token_cache_lock:
+            cached = token_cache.get(token_key)
+        if cached is not None:
+            current_user, expires_at = cached
+            if expires_at > time.time():
+                return current_user
+
         try:
             payload = jwt.decode(
-                token, auth_settings.secret_key, algorithms=[auth_settings.algorithm]
+                token, SECRET_KEY_BYTES, algorithms=[auth_settings.algorithm]
             )
-            username: str = payload.get("sub")
-            if username is None:
-                logger.warning("Invalid token: missing 'sub' claim")
+            user_id: str = payload.get("sub")
+            username: str = payload.get("usr")
+            if user_id is None or username is None:
+                logger.warning("Invalid token: missing 'sub' or 'usr' claim")
                 raise HTTPException(status_code=401, detail="Invalid token")
-            user = user_repo.get_user_by_username(username)
-            if user is None:
-                logger.warning(f"User not found: {username}")
-                raise HTTPException(status_code=401, detail="User not found")
-            return user
+            current_user = CurrentUser(user_id, username)
+            expires_at = payload.get("exp")
+            if expires_at is not None:
+                with token_cache_lock:
+                    token_cache[token_key] = (current_user, expires_at)
+            return current_user
+        except HTTPException:
+            raise
         except jwt.ExpiredSignatureError:
             logger.warning("Token expired")
             raise HTTPException(status_code=401, detail="Token expired")
@@ -178,5 +264,5 @@ class AuthService:
             logger.warning("Invalid token")
             raise HTTPException(status_code=401, detail="Invalid token")
         except Exception as e:
-            logger.error(f"Error decoding token: {e}", exc_info=True)
+            logger.error("Error decoding token: %s", e, exc_info=True)
             raise HTTPException(status_code=500, detail="Internal server error")
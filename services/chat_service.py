@@ -1,9 +1,48 @@
 import random
 import logging
-from typing import Dict, List, Optional
+from functools import lru_cache
+import orjson
+from typing import Dict, Iterator, List, Optional
 from fastapi import Depends
 from repository.chat_repository import ChatRepository
 from constants import predefined_responses
+from utils import ids_match
+
+DEFAULT_RESPONSE = "Sorry, I don't understand that. Can you ask something else?"
+
+# Keys are lowercased once here instead of for every incoming message
+NORMALIZED_RESPONSES = tuple(
+    (key.strip().lower(), response) for key, response in predefined_responses.items()
+)
+
+# Suggestions are sampled from this tuple instead of a fresh list of the keys
+SUGGESTIONS = tuple(predefined_responses)
+# Returned when suggestions cannot be sampled
+DEFAULT_SUGGESTIONS = (
+    "Can you try rephrasing that?",
+    "What else can I help with?",
+    "Do you need more information?",
+)
+
+# Number of distinct normalized messages whose response is remembered.
+# Messages are at most 1000 characters, which bounds the memory this takes.
+RESPONSE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def match_response(normalized_message: str) -> str:
+    """
+    Find the response for a stripped, lowercased message: the response of the
+    first predefined key contained in it, or the default response. Results
+    are memoized, so frequent messages skip the scan over the keys.
+
+    :param normalized_message: The stripped and lowercased message
+    :return: Response message
+    """
+    for key, response in NORMALIZED_RESPONSES:
+        if key in normalized_message:
+            return response
+    return DEFAULT_RESPONSE
 
 
 class ChatService:
@@ -16,100 +55,149 @@ class ChatService:
         self.chat_repo = chat_repo
         self.logger = logging.getLogger(__name__)
 
-    def create_chat(self, chat_name: str, user_id: str) -> Optional[Dict[str, str]]:
+    def create_chat(self, chat_name: str, user_id: str) -> Dict[str, str]:
         """
         Create a new chat for a user.
 
         :param chat_name: Name of the chat
         :param user_id: ID of the user creating the chat
-        :return: A dictionary containing the chat ID and initial interaction if successful, None otherwise
+        :return: A dictionary containing the chat ID and initial interaction
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            greeting = self.get_response("Hello")
-            response = self.chat_repo.create_chat(chat_name, greeting, user_id)
-            if response is not None:
-                response["interaction"]["suggestions"] = self.get_suggestions()
-            return response
-        except Exception as e:
-            self.logger.error(f"Error creating chat for user {user_id}: {str(e)}")
-            return None
+        greeting = self.get_response("Hello")
+        response = self.chat_repo.create_chat(chat_name, greeting, user_id)
+        response["interaction"]["suggestions"] = self.get_suggestions()
+        return response
 
-    def add_message(self, chat_id: str, message: str) -> Optional[Dict[str, str]]:
+    def add_message(
+        self, chat_id: str, user_id: str, message: str
+    ) -> Optional[Dict[str, str]]:
         """
-        Add a message to an existing chat.
+        Add a message to an existing chat owned by the given user.
 
         :param chat_id: ID of the chat
+        :param user_id: ID of the user
         :param message: Message to add
-        :return: A dictionary containing the updated interaction if successful, None otherwise
+        :return: A dictionary containing the new interaction, or None if the user does not own the chat
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            response = self.chat_repo.add_message(
-                chat_id, message, self.get_response(message)
-            )
-            if response is not None:
-                response["suggestions"] = self.get_suggestions()
-            return response
-        except Exception as e:
-            self.logger.error(f"Error adding message to chat {chat_id}: {str(e)}")
-            return None
+        response = self.chat_repo.add_message(
+            chat_id, user_id, message, self.get_response(message)
+        )
+        if response is not None:
+            response["suggestions"] = self.get_suggestions()
+        return response
 
     def edit_message(
-        self, interaction_id: str, new_message: str
+        self, chat_id: str, interaction_id: str, user_id: str, new_message: str
     ) -> Optional[List[Dict]]:
         """
-        Edit a message within a chat.
+        Edit a message within a chat owned by the given user.
 
+        :param chat_id: ID of the chat
         :param interaction_id: ID of the interaction to edit
+        :param user_id: ID of the user
         :param new_message: New message content
-        :return: A list of updated interactions if successful, None otherwise
+        :return: A list of updated interactions, or None if not found in a chat owned by the user
+        :raises SQLAlchemyError: If the database operation fails
+        """
+        response = self.chat_repo.edit_message(
+            chat_id,
+            interaction_id,
+            user_id,
+            new_message,
+            self.get_response(new_message),
+        )
+        if response:
+            response[-1]["suggestions"] = self.get_suggestions()
+        return response
+
+    def delete_message(
+        self, chat_id: str, interaction_id: str, user_id: str
+    ) -> Optional[List[Dict[str, str]]]:
+        """
+        Delete a message and all subsequent messages in a chat owned by the
+        given user.
+
+        :param chat_id: ID of the chat
+        :param interaction_id: ID of the interaction to delete
+        :param user_id: ID of the user
+        :return: A list of remaining interactions, or None if not found in a chat owned by the user
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            response = self.chat_repo.edit_message(
-                interaction_id, new_message, self.get_response(new_message)
-            )
-            if response and len(response) > 0:
-                response[-1]["suggestions"] = self.get_suggestions()
-            return response
-        except Exception as e:
-            self.logger.error(f"Error editing message {interaction_id}: {str(e)}")
-            return None
+        response = self.chat_repo.delete_message(chat_id, interaction_id, user_id)
+        if response:
+            response[-1]["suggestions"] = self.get_suggestions()
+        return response
 
-    def delete_message(self, interaction_id: str) -> Optional[List[Dict[str, str]]]:
+    def get_chat_if_owned(self, chat_id: str, user_id: str) -> Optional[Dict[str, str]]:
         """
-        Delete a message and all subsequent messages in a chat.
+        Get all interactions for a chat, only if it belongs to the given user.
 
-        :param interaction_id: ID of the interaction to delete
-        :return: A list of remaining interactions if successful, None otherwise
+        :param chat_id: ID of the chat
+        :param user_id: ID of the user
+        :return: A dictionary containing chat interactions if the user owns the chat, None otherwise
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            response = self.chat_repo.delete_message(interaction_id)
-            if response and len(response) > 0:
-                response[-1]["suggestions"] = self.get_suggestions()
-            return response
-        except Exception as e:
-            self.logger.error(f"Error deleting message {interaction_id}: {str(e)}")
-            return None
+        response = self.chat_repo.get_chat_if_owned(chat_id, user_id)
+        interactions = response["interactions"] if response else None
+        if interactions:
+            interactions[-1]["suggestions"] = self.get_suggestions()
+        return response
 
-    def get_chat(self, chat_id: str) -> Optional[Dict[str, str]]:
+    def stream_chat_if_owned(
+        self, chat_id: str, user_id: str
+    ) -> Optional[Iterator[bytes]]:
         """
-        Get all interactions for a specific chat.
+        Stream the interactions of a chat as a JSON array, only if it belongs to
+        the given user. The last interaction carries suggestions, as in
+        get_chat_if_owned.
+
+        The first interaction is fetched before returning, so a failing query
+        surfaces as an error here instead of inside an already started response.
 
         :param chat_id: ID of the chat
-        :return: A dictionary containing chat interactions if successful, None otherwise
+        :param user_id: ID of the user
+        :return: An iterator of JSON byte chunks if the user owns the chat, None otherwise
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            response = self.chat_repo.get_chat(chat_id)
-            if (
-                response
-                and response.get("interactions")
-                and len(response["interactions"]) > 0
-            ):
-                response["interactions"][-1]["suggestions"] = self.get_suggestions()
-            return response
-        except Exception as e:
-            self.logger.error(f"Error retrieving chat {chat_id}: {str(e)}")
+        if not ids_match(self.chat_repo.get_chat_owner(chat_id), user_id):
             return None
 
+        interactions = self.chat_repo.iter_chat_interactions(chat_id)
+        first_interaction = next(interactions, None)
+        return self._encode_interactions(chat_id, first_interaction, interactions)
+
+    def _encode_interactions(
+        self,
+        chat_id: str,
+        first_interaction: Optional[Dict],
+        interactions: Iterator[Dict],
+    ) -> Iterator[bytes]:
+        """
+        Encode the interactions of a chat as chunks of a JSON array, holding one
+        interaction back so that suggestions can be attached to the last one.
+        An error part-way through is logged and re-raised, which aborts the
+        response instead of closing the array early.
+
+        :param chat_id: ID of the chat
+        :param first_interaction: The already fetched first interaction, if any
+        :param interactions: Iterator over the remaining interactions
+        :return: An iterator of JSON byte chunks
+        """
+        yield b"["
+        if first_interaction is not None:
+            try:
+                previous = first_interaction
+                for interaction in interactions:
+                    yield orjson.dumps(previous) + b","
+                    previous = interaction
+                yield orjson.dumps({**previous, "suggestions": self.get_suggestions()})
+            except Exception as e:
+                self.logger.error("Error streaming chat %s: %s", chat_id, e)
+                raise
+        yield b"]"
+
     def verify_user_ownership(self, chat_id: str, user_id: str) -> bool:
         """
         Verify if the given user is the owner of the chat.
@@ -117,14 +205,9 @@ class ChatService:
         :param chat_id: ID of the chat
         :param user_id: ID of the user
         :return: True if the user owns the chat, False otherwise
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            return self.chat_repo.verify_user_ownership(chat_id, user_id)
-        except Exception as e:
-            self.logger.error(
-                f"Error verifying ownership for chat {chat_id} and user {user_id}: {str(e)}"
-            )
-            return False
+        return self.chat_repo.verify_user_ownership(chat_id, user_id)
 
     def list_user_chats(self, user_id: str) -> List[Dict[str, str]]:
         """
@@ -132,12 +215,9 @@ class ChatService:
 
         :param user_id: ID of the user
         :return: A list of chats belonging to the user
+        :raises SQLAlchemyError: If the database operation fails
         """
-        try:
-            return self.chat_repo.list_user_chats(user_id)
-        except Exception as e:
-            self.logger.error(f"Error listing chats for user {user_id}: {str(e)}")
-            return []
+        return self.chat_repo.list_user_chats(user_id)
 
     @staticmethod
     def get_response(message: str) -> str:
@@ -148,15 +228,9 @@ class ChatService:
         :return: Response message
         """
         try:
-            message = message.strip().lower()
-            for key, response in predefined_responses.items():
-                if key.lower() in message:
-                    return response
-            return "Sorry, I don't understand that. Can you ask something else?"
+            return match_response(message.strip().lower())
         except Exception as e:
-            logging.error(
-                f"Error generating response for message '{message}': {str(e)}"
-            )
+            logging.error("Error generating response for message '%s': %s", message, e)
             return "An error occurred while generating a response. Please try again."
 
     @staticmethod
@@ -167,13 +241,7 @@ class ChatService:
         :return: List of suggestions
         """
         try:
-            return random.sample(
-                list(predefined_responses.keys()), min(3, len(predefined_responses))
-            )
+            return random.sample(SUGGESTIONS, min(3, len(SUGGESTIONS)))
         except Exception as e:
-            logging.error(f"Error generating suggestions: {str(e)}")
-            return [
-                "Can you try rephrasing that?",
-                "What else can I help with?",
-                "Do you need more information?",
-            ]
+            logging.error("Error generating suggestions: %s", e)
+            return list(DEFAULT_SUGGESTIONS)
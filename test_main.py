@@ -1,21 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import pytest
 from fastapi.testclient import TestClient
 from main import app
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from passlib.context import CryptContext
+from passlib.hash import bcrypt as passlib_bcrypt
+from sqlalchemy import create_engine, event, select
 from sqlalchemy.exc import SQLAlchemyError
-from repository.database import Base
+from sqlalchemy.pool import StaticPool
+from repository import chat_repository, user_repository
+from repository.chat_repository import ChatRepository
+from repository.database import SessionLocal, User, get_engine
+from repository.user_repository import UserRepository
+from services import auth_service
 from utils import create_uuid
-import logging
-
-# Initialize FastAPI test client
-client = TestClient(app)
-
-# Configure logging
-logging.basicConfig(level=logging.ERROR)
 
 # Constants
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 GREETING_RESPONSE = "Hello! How can I assist you today?"
 EDIT_NOT_ALLOWED_MESSAGE = "You do not have permission to edit messages in this chat."
 READ_NOT_ALLOWED_MESSAGE = "You do not have permission to access this chat."
@@ -23,97 +24,185 @@ DELETE_NOT_ALLOWED_MESSAGE = (
     "You do not have permission to delete messages in this chat."
 )
 
-# Set up a test database
+# Message bodies sent by several tests, serialized once and sent as content=
+HELLO_BODY = b'{"message":"hello"}'
+HOW_ARE_YOU_BODY = b'{"message":"how are you?"}'
+
+# Set up an in-memory test database. StaticPool keeps a single connection,
+# so every session and thread sees the same database.
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+
+
+# pysqlite emits BEGIN and SAVEPOINT on its own terms, which breaks rolling
+# back a test's transaction. Turn that off and let SQLAlchemy emit BEGIN.
+@event.listens_for(engine, "connect")
+def disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def emit_begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+# Point the app's sessions at the test database. Rebinding SessionLocal covers
+# both the request-scoped sessions and the ones opened for streaming. The
+# override makes the app's startup create the tables in it.
+SessionLocal.configure(bind=engine)
+app.dependency_overrides[get_engine] = lambda: engine
+
+# The app's password hashing context, at bcrypt's lowest cost, for the tests
+# that exercise real hashing
+BCRYPT_TEST_ROUNDS = 4
+bcrypt_pwd_context = auth_service.pwd_context.copy(
+    bcrypt_sha256__default_rounds=BCRYPT_TEST_ROUNDS,
+    bcrypt_sha256__min_rounds=BCRYPT_TEST_ROUNDS,
+    bcrypt_sha256__max_rounds=BCRYPT_TEST_ROUNDS,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create the test database
-try:
-    Base.metadata.create_all(bind=engine)
-except SQLAlchemyError as e:
-    logging.error(f"Error creating test database tables: {e}")
+# Store test passwords as plain text. bcrypt is slow by design, and its cost
+# would otherwise dominate every register and login in the suite. AuthService
+# reads the module's context when it is created, so this covers every request.
+auth_service.pwd_context = CryptContext(schemes=["plaintext"])
+
+
+def request_ok(client, method, url, failure_message, **kwargs):
+    """
+    Send a request, assert that it succeeded and return its parsed JSON body.
+    """
+    response = client.request(method, url, **kwargs)
+    assert response.status_code == 200, f"{failure_message}: {response.text}"
+    return response.json()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Yield a test client shared by all tests. Entering it runs the app's
+    startup, which creates the test database tables, and keeps one event
+    loop running for all requests instead of starting one per request.
+    """
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
-def create_user_and_get_token():
+def auth_headers(client):
     """
-    Register and log in a user, then yield the access token.
+    Register a user, then yield the headers that authenticate as them. They
+    also declare a JSON content type, for requests that send a pre-serialized
+    body.
     """
     user_data = {"username": create_uuid(), "password": "password123"}
-    response = client.post("/auth/register", json=user_data)
-    assert response.status_code == 200, "Failed to register user"
-    yield response.json()["access_token"]
+    body = request_ok(
+        client, "POST", "/auth/register", "Failed to register user", json=user_data
+    )
+    yield {
+        "Authorization": f"Bearer {body['access_token']}",
+        "Content-Type": "application/json",
+    }
 
 
 @pytest.fixture
-def create_chat(create_user_and_get_token):
+def create_chat(client, auth_headers):
     """
     Create a chat and yield the chat ID.
     """
-    with TestingSessionLocal() as db:
-        try:
-            headers = {"Authorization": f"Bearer {create_user_and_get_token}"}
-            response = client.post(
-                f"/chats/init?chat_name={create_uuid()[:10]}", headers=headers
-            )
-            assert response.status_code == 200, "Failed to create chat"
-            yield response.json()["chat_id"]
-        except SQLAlchemyError as e:
-            logging.error(f"Error creating chat: {e}")
-            db.rollback()
-        finally:
-            db.close()
+    body = request_ok(
+        client,
+        "POST",
+        f"/chats/init?chat_name={create_uuid()[-10:]}",
+        "Failed to create chat",
+        headers=auth_headers,
+    )
+    yield body["chat_id"]
 
 
-@pytest.fixture(scope="function", autouse=True)
-def clear_test_data():
+def clear_app_caches():
+    """
+    Empty the app's in-memory caches of database rows and decoded tokens.
+    """
+    with chat_repository.cache_lock:
+        chat_repository.chat_cache.clear()
+        chat_repository.user_chats_cache.clear()
+    with chat_repository.chat_owner_cache_lock:
+        chat_repository.chat_owner_cache.clear()
+    with user_repository.user_cache_lock:
+        user_repository.user_cache.clear()
+    with auth_service.token_cache_lock:
+        auth_service.token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def rollback_test_data(client):
     """
-    Clear the test database before each test to ensure no data persistence.
+    Run each test inside one outer transaction that is rolled back afterwards,
+    so nothing a test writes persists and no tables need clearing. The app's
+    sessions join it through SAVEPOINTs, so their commits stay inside it. The
+    app's caches are cleared too, as they may hold rows that were rolled back.
     """
-    with TestingSessionLocal() as db:
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        SessionLocal.configure(
+            bind=connection, join_transaction_mode="create_savepoint"
+        )
         try:
-            db.query(Base.metadata.tables["interactions"]).delete()
-            db.query(Base.metadata.tables["users"]).delete()
-            db.commit()
-        except SQLAlchemyError as e:
-            logging.error(f"Error clearing test data: {e}")
-            db.rollback()
+            yield
         finally:
-            db.close()
+            SessionLocal.configure(
+                bind=engine, join_transaction_mode="conservative_savepoint"
+            )
+            transaction.rollback()
+            clear_app_caches()
 
 
-def test_register_and_login():
+def test_register_and_login(client):
     """
     Test user registration and login.
     """
     user_data = {"username": create_uuid(), "password": create_uuid()}
 
     # Test registration
-    response = client.post("/auth/register", json=user_data)
-    assert response.status_code == 200, "User registration failed"
-    assert (
-        "access_token" in response.json()
-    ), "Access token not returned after registration"
+    body = request_ok(
+        client, "POST", "/auth/register", "User registration failed", json=user_data
+    )
+    assert "access_token" in body, "Access token not returned after registration"
 
     # Test login
-    response = client.post("/auth/login", json=user_data)
-    assert response.status_code == 200, "User login failed"
-    assert "access_token" in response.json(), "Access token not returned after login"
+    body = request_ok(
+        client, "POST", "/auth/login", "User login failed", json=user_data
+    )
+    assert "access_token" in body, "Access token not returned after login"
 
 
-def test_create_chat(create_user_and_get_token):
+def test_register_existing_username(client):
     """
-    Test creating a new chat and verifying the default interaction.
+    Test that registering a taken username is rejected.
     """
-    headers = {"Authorization": f"Bearer {create_user_and_get_token}"}
-    response = client.post(
-        f"/chats/init?chat_name={create_uuid()[:10]}", headers=headers
+    user_data = {"username": create_uuid(), "password": "password123"}
+    request_ok(
+        client, "POST", "/auth/register", "User registration failed", json=user_data
     )
-    assert response.status_code == 200, "Failed to create chat"
 
-    response_json = response.json()
+    response = client.post("/auth/register", json=user_data)
+    assert response.status_code == 409, "Duplicate username should be rejected"
+
+
+def test_create_chat(client, auth_headers):
+    """
+    Test creating a new chat and verifying the default interaction.
+    """
+    response_json = request_ok(
+        client,
+        "POST",
+        f"/chats/init?chat_name={create_uuid()[-10:]}",
+        "Failed to create chat",
+        headers=auth_headers,
+    )
     assert "chat_id" in response_json, "Chat ID not returned"
     assert "interaction" in response_json, "Default interaction not returned"
     assert "chat_name" in response_json, "Chat name not returned"
@@ -124,20 +213,21 @@ def test_create_chat(create_user_and_get_token):
     assert "suggestions" in interaction, "Suggestions not included in interaction"
 
 
-def test_add_message(create_chat, create_user_and_get_token):
+def test_add_message(client, create_chat, auth_headers):
     """
     Test adding a message to a chat.
     """
     chat_id = create_chat
-    headers = {"Authorization": f"Bearer {create_user_and_get_token}"}
-    message_data = {"message": "hello"}
-
-    response = client.post(
-        f"/chats/{chat_id}/messages", json=message_data, headers=headers
+    messages_url = f"/chats/{chat_id}/messages"
+
+    response_json = request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add message",
+        content=HELLO_BODY,
+        headers=auth_headers,
     )
-    assert response.status_code == 200, "Failed to add message"
-
-    response_json = response.json()
     assert "message" in response_json, "Message not returned in response"
     assert "response" in response_json, "Bot response not returned"
     assert response_json["message"] == "hello", "Incorrect message returned"
@@ -145,36 +235,42 @@ def test_add_message(create_chat, create_user_and_get_token):
     assert "suggestions" in response_json, "Suggestions not included in response"
 
 
-def test_edit_message(create_chat, create_user_and_get_token):
+def test_edit_message(client, create_chat, auth_headers):
     """
     Test editing a message and verifying that only subsequent interactions are deleted.
     """
     chat_id = create_chat
-    headers = {"Authorization": f"Bearer {create_user_and_get_token}"}
+    messages_url = f"/chats/{chat_id}/messages"
 
     # Add first message
-    message_data_1 = {"message": "hello"}
-    response = client.post(
-        f"/chats/{chat_id}/messages", json=message_data_1, headers=headers
-    )
-    assert response.status_code == 200, "Failed to add first message"
-    interaction_id_1 = response.json()["interaction_id"]
+    interaction_id_1 = request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add first message",
+        content=HELLO_BODY,
+        headers=auth_headers,
+    )["interaction_id"]
 
     # Add second message
-    message_data_2 = {"message": "how are you?"}
-    response = client.post(
-        f"/chats/{chat_id}/messages", json=message_data_2, headers=headers
+    request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add second message",
+        content=HOW_ARE_YOU_BODY,
+        headers=auth_headers,
     )
-    assert response.status_code == 200, "Failed to add second message"
 
     # Edit first message
-    edit_data = {"message": "how are you?"}
-    response = client.patch(
-        f"/chats/{chat_id}/messages/{interaction_id_1}", json=edit_data, headers=headers
+    remaining_interactions = request_ok(
+        client,
+        "PATCH",
+        f"{messages_url}/{interaction_id_1}",
+        "Failed to edit message",
+        content=HOW_ARE_YOU_BODY,
+        headers=auth_headers,
     )
-    assert response.status_code == 200, "Failed to edit message"
-
-    remaining_interactions = response.json()
     assert (
         remaining_interactions[1]["message"] == "how are you?"
     ), "Message not edited correctly"
@@ -187,43 +283,50 @@ def test_edit_message(create_chat, create_user_and_get_token):
     ), "Suggestions not included in last interaction"
 
     # Verify chat state after edit
-    response = client.get(f"/chats/{chat_id}", headers=headers)
-    interactions = response.json()["interactions"]
+    interactions = request_ok(
+        client, "GET", f"/chats/{chat_id}", "Failed to get chat", headers=auth_headers
+    )["interactions"]
     assert len(interactions) == 2, "Incorrect number of interactions after edit"
     assert (
         "suggestions" in interactions[-1]
     ), "Suggestions not included in last interaction"
 
 
-def test_delete_message(create_chat, create_user_and_get_token):
+def test_delete_message(client, create_chat, auth_headers):
     """
     Test deleting a message and verifying that only subsequent interactions are deleted.
     """
     chat_id = create_chat
-    headers = {"Authorization": f"Bearer {create_user_and_get_token}"}
+    messages_url = f"/chats/{chat_id}/messages"
 
     # Add first message
-    message_data_1 = {"message": "hello"}
-    response = client.post(
-        f"/chats/{chat_id}/messages", json=message_data_1, headers=headers
-    )
-    assert response.status_code == 200, "Failed to add first message"
-    interaction_id_1 = response.json()["interaction_id"]
+    interaction_id_1 = request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add first message",
+        content=HELLO_BODY,
+        headers=auth_headers,
+    )["interaction_id"]
 
     # Add second message
-    message_data_2 = {"message": "how are you?"}
-    response = client.post(
-        f"/chats/{chat_id}/messages", json=message_data_2, headers=headers
+    request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add second message",
+        content=HOW_ARE_YOU_BODY,
+        headers=auth_headers,
     )
-    assert response.status_code == 200, "Failed to add second message"
 
     # Delete first message
-    response = client.delete(
-        f"/chats/{chat_id}/messages/{interaction_id_1}", headers=headers
+    remaining_interactions = request_ok(
+        client,
+        "DELETE",
+        f"{messages_url}/{interaction_id_1}",
+        "Failed to delete message",
+        headers=auth_headers,
     )
-    assert response.status_code == 200, "Failed to delete message"
-
-    remaining_interactions = response.json()
     assert (
         len(remaining_interactions) == 1
     ), "Incorrect number of interactions after delete"
@@ -236,24 +339,27 @@ def test_delete_message(create_chat, create_user_and_get_token):
     ), "Suggestions not included in last interaction"
 
 
-def test_user_ownership(create_user_and_get_token):
+def test_user_ownership(client, auth_headers):
     """
     Test user ownership validation.
     """
-    headers_user_1 = {"Authorization": f"Bearer {create_user_and_get_token}"}
+    headers_user_1 = auth_headers
 
     # Create chat for user 1
-    response = client.post(
-        f"/chats/init?chat_name={create_uuid()[:10]}", headers=headers_user_1
-    )
-    assert response.status_code == 200, "Failed to create chat for user 1"
-    chat_id = response.json()["chat_id"]
+    chat_id = request_ok(
+        client,
+        "POST",
+        f"/chats/init?chat_name={create_uuid()[-10:]}",
+        "Failed to create chat for user 1",
+        headers=headers_user_1,
+    )["chat_id"]
+    messages_url = f"/chats/{chat_id}/messages"
 
     # Create user 2
     user_data_2 = {"username": create_uuid(), "password": "password456"}
-    response = client.post("/auth/register", json=user_data_2)
-    assert response.status_code == 200, "Failed to create user 2"
-    token_user_2 = response.json()["access_token"]
+    token_user_2 = request_ok(
+        client, "POST", "/auth/register", "Failed to create user 2", json=user_data_2
+    )["access_token"]
 
     headers_user_2 = {"Authorization": f"Bearer {token_user_2}"}
 
@@ -266,7 +372,7 @@ def test_user_ownership(create_user_and_get_token):
 
     # Test write access
     response = client.post(
-        f"/chats/{chat_id}/messages", json={"message": "hello"}, headers=headers_user_2
+        messages_url, json={"message": "hello"}, headers=headers_user_2
     )
     assert response.status_code == 403, "User 2 should not have write access"
     assert (
@@ -275,7 +381,7 @@ def test_user_ownership(create_user_and_get_token):
 
     # Test edit access
     response = client.patch(
-        f"/chats/{chat_id}/messages/{create_uuid()}",
+        f"{messages_url}/{create_uuid()}",
         json={"message": "edit"},
         headers=headers_user_2,
     )
@@ -285,31 +391,33 @@ def test_user_ownership(create_user_and_get_token):
     ), "Incorrect error message for edit access"
 
     # Test delete access
-    response = client.delete(
-        f"/chats/{chat_id}/messages/{create_uuid()}", headers=headers_user_2
-    )
+    response = client.delete(f"{messages_url}/{create_uuid()}", headers=headers_user_2)
     assert response.status_code == 403, "User 2 should not have delete access"
     assert (
         response.json()["detail"] == DELETE_NOT_ALLOWED_MESSAGE
     ), "Incorrect error message for delete access"
 
 
-def test_list_user_chats(create_user_and_get_token):
+def test_list_user_chats(client, auth_headers):
     """
     Test listing all chats for a user.
     """
-    headers = {"Authorization": f"Bearer {create_user_and_get_token}"}
 
     # Create multiple chats
-    chat_names = [create_uuid()[:10] for _ in range(3)]
+    chat_names = [create_uuid()[-10:] for _ in range(3)]
     for chat_name in chat_names:
-        response = client.post(f"/chats/init?chat_name={chat_name}", headers=headers)
-        assert response.status_code == 200, f"Failed to create chat: {chat_name}"
+        request_ok(
+            client,
+            "POST",
+            f"/chats/init?chat_name={chat_name}",
+            f"Failed to create chat: {chat_name}",
+            headers=auth_headers,
+        )
 
     # List all chats for the user
-    response = client.get("/chats", headers=headers)
-    assert response.status_code == 200, "Failed to list user chats"
-    user_chats = response.json()
+    user_chats = request_ok(
+        client, "GET", "/chats", "Failed to list user chats", headers=auth_headers
+    )
 
     # Verify that all created chats are listed
     assert len(user_chats) == 3, "Incorrect number of chats returned"
@@ -318,3 +426,315 @@ def test_list_user_chats(create_user_and_get_token):
         assert (
             chat_name in listed_chat_names
         ), f"Chat {chat_name} not found in user's chat list"
+
+
+def test_stream_chat_interactions(client, create_chat, auth_headers):
+    """
+    Test streaming the interactions of a chat.
+    """
+    chat_id = create_chat
+    messages_url = f"/chats/{chat_id}/messages"
+
+    request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add message",
+        content=HELLO_BODY,
+        headers=auth_headers,
+    )
+
+    interactions = request_ok(
+        client,
+        "GET",
+        f"/chats/{chat_id}/stream",
+        "Failed to stream chat",
+        headers=auth_headers,
+    )
+    assert len(interactions) == 2, "Incorrect number of streamed interactions"
+    assert [i["index"] for i in interactions] == [0, 1], "Interactions out of order"
+    assert interactions[1]["message"] == "hello", "Incorrect streamed message"
+    assert (
+        "suggestions" in interactions[-1]
+    ), "Suggestions not included in last interaction"
+
+
+def test_edit_message_of_another_chat(client, create_chat, auth_headers):
+    """
+    Test that an interaction can only be edited through the chat it belongs to.
+    """
+    chat_id = create_chat
+    messages_url = f"/chats/{chat_id}/messages"
+
+    interaction_id = request_ok(
+        client,
+        "POST",
+        messages_url,
+        "Failed to add message",
+        content=HELLO_BODY,
+        headers=auth_headers,
+    )["interaction_id"]
+
+    other_chat_id = request_ok(
+        client,
+        "POST",
+        f"/chats/init?chat_name={create_uuid()[-10:]}",
+        "Failed to create second chat",
+        headers=auth_headers,
+    )["chat_id"]
+
+    response = client.patch(
+        f"/chats/{other_chat_id}/messages/{interaction_id}",
+        json={"message": "edit"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 404, "Interaction edited through another chat"
+
+
+def test_interaction_timestamps_match_database(client, create_chat, auth_headers):
+    """
+    Test that the timestamp returned for a new interaction is the one stored.
+    """
+    chat_id = create_chat
+    interaction = request_ok(
+        client,
+        "POST",
+        f"/chats/{chat_id}/messages",
+        "Failed to add message",
+        content=HELLO_BODY,
+        headers=auth_headers,
+    )
+    assert interaction["timestamp"] is not None, "Timestamp not returned"
+
+    # Read the chat back from the database rather than the cache
+    with chat_repository.cache_lock:
+        chat_repository.chat_cache.pop(chat_id, None)
+    interactions = request_ok(
+        client, "GET", f"/chats/{chat_id}", "Failed to get chat", headers=auth_headers
+    )["interactions"]
+    assert (
+        interactions[1]["timestamp"] == interaction["timestamp"]
+    ), "Returned timestamp differs from the stored one"
+
+
+def test_stream_chat_database_error(client, create_chat, auth_headers, monkeypatch):
+    """
+    Test that a failing query turns into an error response, not a broken stream.
+    """
+
+    def failing_iter_chat_interactions(self, chat_id):
+        raise SQLAlchemyError("database unavailable")
+        yield
+
+    monkeypatch.setattr(
+        ChatRepository, "iter_chat_interactions", failing_iter_chat_interactions
+    )
+    response = client.get(f"/chats/{create_chat}/stream", headers=auth_headers)
+    assert response.status_code == 500, "Database error not reported"
+
+
+def test_database_error_response(client, auth_headers, monkeypatch):
+    """
+    Test that database errors reach the app's handler and become a 500.
+    """
+
+    def failing_list_user_chats(self, user_id):
+        raise SQLAlchemyError("database unavailable")
+
+    monkeypatch.setattr(ChatRepository, "list_user_chats", failing_list_user_chats)
+    response = client.get("/chats", headers=auth_headers)
+    assert response.status_code == 500, "Database error not reported"
+    assert response.json() == {"detail": "Internal server error"}
+
+
+def test_unexpected_error_response(auth_headers, monkeypatch):
+    """
+    Test that errors other than database errors also become a JSON 500.
+    """
+
+    def failing_list_user_chats(self, user_id):
+        raise KeyError("user_id")
+
+    monkeypatch.setattr(ChatRepository, "list_user_chats", failing_list_user_chats)
+    # The server error middleware re-raises after responding, so keep the
+    # client from raising it in the test
+    error_client = TestClient(app, raise_server_exceptions=False)
+    response = error_client.get("/chats", headers=auth_headers)
+    assert response.status_code == 500, "Unexpected error not reported"
+    assert response.json() == {"detail": "Internal server error"}
+
+
+def test_concurrent_add_message(client, create_chat, auth_headers):
+    """
+    Test that messages added to one chat at the same time get distinct indexes.
+    """
+    messages_url = f"/chats/{create_chat}/messages"
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        interactions = list(
+            executor.map(
+                lambda _: request_ok(
+                    client,
+                    "POST",
+                    messages_url,
+                    "Failed to add message",
+                    content=HELLO_BODY,
+                    headers=auth_headers,
+                ),
+                range(16),
+            )
+        )
+    assert sorted(i["index"] for i in interactions) == list(
+        range(1, 17)
+    ), "Concurrent messages share an index"
+
+    # The cached chat and the stored one agree
+    cached = request_ok(
+        client,
+        "GET",
+        f"/chats/{create_chat}",
+        "Failed to get chat",
+        headers=auth_headers,
+    )["interactions"]
+    with chat_repository.cache_lock:
+        chat_repository.chat_cache.pop(create_chat, None)
+    stored = request_ok(
+        client,
+        "GET",
+        f"/chats/{create_chat}",
+        "Failed to get chat",
+        headers=auth_headers,
+    )["interactions"]
+    assert [i["index"] for i in stored] == list(range(17)), "Stored indexes wrong"
+    assert [i["interaction_id"] for i in cached] == [
+        i["interaction_id"] for i in stored
+    ], "Cached interactions out of order"
+
+
+def test_chat_load_racing_delete(client, create_chat, auth_headers, monkeypatch):
+    """
+    Test that a chat loaded into the cache while a message is deleted does not
+    keep the deleted interactions.
+    """
+    chat_url = f"/chats/{create_chat}"
+    added = request_ok(
+        client,
+        "POST",
+        f"{chat_url}/messages",
+        "Failed to add message",
+        content=HELLO_BODY,
+        headers=auth_headers,
+    )
+    with chat_repository.cache_lock:
+        chat_repository.chat_cache.pop(create_chat, None)
+
+    # Hold the load after its query until the delete is done, or for a second
+    # if the delete has to wait for the load. The test sessions share one
+    # connection through savepoints, so a delete that waited for the load
+    # also waits for the load's session to close before it queries.
+    loading = threading.Event()
+    resumed = threading.Event()
+    deleted = threading.Event()
+    loaded = threading.Event()
+    interaction_from_row = chat_repository.interaction_from_row
+    get_owned_interaction_index = ChatRepository.get_owned_interaction_index
+
+    def slow_interaction_from_row(row):
+        if not loading.is_set():
+            loading.set()
+            deleted.wait(timeout=1)
+            resumed.set()
+        return interaction_from_row(row)
+
+    def get_index_after_load(self, *args):
+        if resumed.is_set():
+            loaded.wait(timeout=5)
+        return get_owned_interaction_index(self, *args)
+
+    def load_chat():
+        try:
+            return request_ok(
+                client, "GET", chat_url, "Failed to get chat", headers=auth_headers
+            )
+        finally:
+            loaded.set()
+
+    def delete_after_load_started():
+        loading.wait(timeout=5)
+        try:
+            return request_ok(
+                client,
+                "DELETE",
+                f"{chat_url}/messages/{added['interaction_id']}",
+                "Failed to delete message",
+                headers=auth_headers,
+            )
+        finally:
+            deleted.set()
+
+    monkeypatch.setattr(
+        chat_repository, "interaction_from_row", slow_interaction_from_row
+    )
+    monkeypatch.setattr(
+        ChatRepository, "get_owned_interaction_index", get_index_after_load
+    )
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        load = executor.submit(load_chat)
+        delete = executor.submit(delete_after_load_started)
+        load.result()
+        delete.result()
+
+    cached = request_ok(
+        client, "GET", chat_url, "Failed to get chat", headers=auth_headers
+    )["interactions"]
+    assert [i["index"] for i in cached] == [0], "Cache kept deleted interactions"
+
+
+def test_login_rehashes_legacy_bcrypt_hash(client, monkeypatch):
+    """
+    Test that a legacy bcrypt hash verifies with the real hashing context and
+    is replaced by a bcrypt_sha256 hash on login.
+    """
+    monkeypatch.setattr(auth_service, "pwd_context", bcrypt_pwd_context)
+    user_data = {"username": create_uuid(), "password": "password123"}
+    legacy_hash = passlib_bcrypt.using(rounds=BCRYPT_TEST_ROUNDS).hash(
+        user_data["password"]
+    )
+    with SessionLocal() as db:
+        UserRepository(db).create_user(user_data["username"], legacy_hash)
+
+    request_ok(client, "POST", "/auth/login", "Legacy login failed", json=user_data)
+
+    with SessionLocal() as db:
+        stored_hash = db.execute(
+            select(User.hashed_password).where(User.username == user_data["username"])
+        ).scalar_one()
+    assert (
+        bcrypt_pwd_context.identify(stored_hash) == "bcrypt_sha256"
+    ), "Legacy hash not rehashed"
+    request_ok(
+        client, "POST", "/auth/login", "Login after rehash failed", json=user_data
+    )
+
+    # Unknown users go through dummy_verify and are rejected the same way
+    response = client.post(
+        "/auth/login", json={"username": create_uuid(), "password": "password123"}
+    )
+    assert response.status_code == 401, "Unknown user not rejected"
+
+
+def test_cached_chat_not_modified_by_responses(client, create_chat, auth_headers):
+    """
+    Test that suggestions are attached to copies, not to the cached chat.
+    """
+    request_ok(
+        client,
+        "GET",
+        f"/chats/{create_chat}",
+        "Failed to get chat",
+        headers=auth_headers,
+    )
+    with chat_repository.cache_lock:
+        cached_interactions = chat_repository.chat_cache[create_chat]["interactions"]
+        assert all(
+            "suggestions" not in interaction for interaction in cached_interactions
+        ), "Suggestions stored in the cached chat"
@@ -1,5 +1,37 @@
-import uuid
+import hmac
+import os
+import time
+from typing import Optional
+
+UUID_VERSION_MASK = 0xF << 76
+UUID_VERSION_7 = 0x7 << 76
+UUID_VARIANT_MASK = 0x3 << 62
+UUID_VARIANT_RFC_4122 = 0x2 << 62
 
 
 def create_uuid() -> str:
-    return str(uuid.uuid4())
+    """
+    Create a time-ordered (version 7) UUID as a 32-character hex string.
+
+    The first 48 bits are the Unix time in milliseconds, so new primary keys
+    sort after existing ones and inserts land at the end of the B-tree index
+    instead of on a random page. The value is formatted directly, without
+    building a uuid.UUID object or adding dashes.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(
+        os.urandom(10), "big"
+    )
+    value = (value & ~UUID_VERSION_MASK) | UUID_VERSION_7
+    value = (value & ~UUID_VARIANT_MASK) | UUID_VARIANT_RFC_4122
+    return format(value, "032x")
+
+
+def ids_match(expected_id: Optional[str], given_id: str) -> bool:
+    """
+    Compare two identifiers in constant time, so the time taken does not
+    reveal how long a matching prefix the given identifier has.
+    """
+    if expected_id is None:
+        return False
+    return hmac.compare_digest(expected_id.encode(), given_id.encode())